@@ -0,0 +1,253 @@
+"""Headless benchmarks for the Sudoku solver and generator and the crossword layout.
+
+    python benchmarks/bench.py                          # run everything, JSON to stdout
+    python benchmarks/bench.py --output results.json --compare benchmarks/baseline.json
+    python benchmarks/bench.py --save-baseline          # refresh benchmarks/baseline.json
+
+Every case reseeds `random` from --seed and the case name, and reads its
+inputs from benchmarks/corpora, so runs are repeatable and need no display
+or network.  Latency is timed with tracemalloc off; peak memory comes from a
+second, traced pass over the same inputs.
+"""
+import argparse
+import gc
+import json
+import math
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import sudoku
+import crossword_puzzle_random_words as crossword
+
+CORPUS_DIR = os.path.join(BENCH_DIR, 'corpora')
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, 'baseline.json')
+SOLVE_ROUNDS = {'easy': 3, 'hard': 2, 'pathological': 2}
+GENERATE_COUNTS = {'Easy': 20, 'Medium': 15, 'Challenging': 10}
+CROSSWORD_LAYOUTS = 300
+CROSSWORD_COMPILES = 100
+DERIVE_BATCH = 4096
+DERIVE_ROUNDS = 20
+# Allowed relative slowdown (or growth, for memory) before a metric counts
+# as a regression.  Tail latency is noisier, so it gets more room.
+THRESHOLDS = {'p50_ms': 0.3, 'p99_ms': 0.5, 'throughput_per_s': 0.35, 'peak_kib': 0.2}
+# Differences below these are noise whatever the ratio.
+ABSOLUTE_FLOORS = {'p50_ms': 0.05, 'p99_ms': 0.2, 'throughput_per_s': 0.0, 'peak_kib': 64.0}
+
+def load_sudoku_corpus(name):
+    with open(os.path.join(CORPUS_DIR, f'sudoku_{name}.txt')) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def load_word_lists():
+    with open(os.path.join(CORPUS_DIR, 'crossword_words.json')) as f:
+        return json.load(f)
+
+def percentile(samples, pct):
+    # Nearest-rank percentile.
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def measure(name, seed, inputs, run, repeat=3):
+    # Times run(x) for every input, `repeat` times over, and keeps the
+    # fastest pass to damp scheduler noise.  A final pass under tracemalloc
+    # gives the peak.  Every pass starts from the same seed.
+    best = None
+    for _ in range(repeat):
+        random.seed(f'{seed}:{name}')
+        samples = []
+        start = time.perf_counter()
+        for item in inputs:
+            t0 = time.perf_counter()
+            run(item)
+            samples.append(time.perf_counter() - t0)
+        total = time.perf_counter() - start
+        if best is None or total < best[0]:
+            best = total, samples
+    total, samples = best
+    random.seed(f'{seed}:{name}')
+    gc.collect()
+    tracemalloc.start()
+    for item in inputs:
+        run(item)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        'count': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 4),
+        'p99_ms': round(percentile(samples, 99) * 1000, 4),
+        'mean_ms': round(total / len(samples) * 1000, 4),
+        'throughput_per_s': round(len(samples) / total, 2),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+def solve_cases():
+    game = sudoku.Sudoku('Easy', puzzle=([[0]*9 for _ in range(9)], None))
+    def run(text):
+        game.solve(sudoku.board_from_string(text))
+    for corpus, rounds in SOLVE_ROUNDS.items():
+        yield f'solve/{corpus}', load_sudoku_corpus(corpus) * rounds, run
+
+def generate_cases():
+    def run(level):
+        sudoku.Sudoku(level)
+    for level, count in GENERATE_COUNTS.items():
+        yield f'generate/{level}', [level] * count, run
+
+def derive_cases():
+    # SeedPool.derive batches, with the solved corpus puzzles as seeds.
+    game = sudoku.Sudoku('Easy', puzzle=([[0]*9 for _ in range(9)], None))
+    for corpus in ('easy', 'hard'):
+        pool = sudoku.SeedPool([corpus], refresh=False, rng=random)
+        for text in load_sudoku_corpus(corpus):
+            puzzle = sudoku.board_from_string(text)
+            solution = puzzle.copy()
+            game.solve(solution)
+            pool.add(corpus, [(puzzle, solution)])
+        def run(count, pool=pool, corpus=corpus):
+            pool.derive(corpus, count)
+        yield f'derive/{corpus}', [DERIVE_BATCH] * DERIVE_ROUNDS, run
+
+def fits(grid, word, row, col, across):
+    # True if word can go at (row, col) without clashing with a letter.
+    size = grid.size
+    if row < 0 or col < 0:
+        return False
+    if across:
+        if col + len(word) > size:
+            return False
+        occupied = grid.row_bits[row] >> col
+        step = 1
+    else:
+        if row + len(word) > size:
+            return False
+        occupied = grid.col_bits[col] >> row
+        step = size
+    occupied &= (1 << len(word)) - 1
+    # Only cells that already hold a letter need comparing.
+    start = row * size + col
+    while occupied:
+        low = occupied & -occupied
+        k = low.bit_length() - 1
+        if grid.cells[start + k * step] != word[k]:
+            return False
+        occupied ^= low
+    return True
+
+def layout_crossword(word_list, grid_size=12, word_count=6):
+    # The game's first-fit layout before compile_crossword(), kept as the
+    # baseline for the compile cases.  Each word goes at the first crossing
+    # with a placed word whose letters match, ignoring adjacency.
+    grid = crossword.CrosswordGrid(grid_size)
+    random.shuffle(word_list)
+    for word_data in word_list:
+        if len(grid.placements) >= word_count:
+            break
+        word = word_data['word']
+        if not grid.placements:
+            if len(word) <= grid_size:
+                grid.place(crossword.Placement(word, word_data['clue'], grid_size // 2,
+                                               (grid_size - len(word)) // 2, True))
+            continue
+        for row, col, across in grid.crossings(word):
+            if fits(grid, word, row, col, across):
+                grid.place(crossword.Placement(word, word_data['clue'], row, col, across))
+                break
+    return [placement.as_dict() for placement in grid.placements]
+
+def crossword_cases():
+    def run(words):
+        layout_crossword(list(words))
+    for category, words in load_word_lists().items():
+        yield f'crossword/{category}', [words] * CROSSWORD_LAYOUTS, run
+
+def compile_cases():
+    # Searches end on their own long before the time budget on these lists.
+    def run(words):
+        crossword.compile_crossword(list(words), rng=random)
+    for category, words in load_word_lists().items():
+        yield f'compile/{category}', [words] * CROSSWORD_COMPILES, run
+
+def run_benchmarks(seed, only=None, repeat=3):
+    results = {}
+    for cases in (solve_cases, generate_cases, derive_cases, crossword_cases, compile_cases):
+        for name, inputs, run in cases():
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = measure(name, seed, inputs, run, repeat)
+            print(f'{name:24} p50 {results[name]["p50_ms"]:9.3f} ms  '
+                  f'p99 {results[name]["p99_ms"]:9.3f} ms  '
+                  f'{results[name]["throughput_per_s"]:10.1f}/s  '
+                  f'peak {results[name]["peak_kib"]:8.1f} KiB', file=sys.stderr)
+    return {
+        'meta': {
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'machine': platform.machine(),
+            'system': platform.system(),
+        },
+        'results': results,
+    }
+
+def compare(current, baseline, threshold=None):
+    # Returns a list of (case, metric, baseline value, current value) for
+    # every metric that got worse by more than its threshold.
+    regressions = []
+    for name, base in baseline['results'].items():
+        now = current['results'].get(name)
+        if now is None:
+            continue
+        for metric, limit in THRESHOLDS.items():
+            limit = limit if threshold is None else threshold
+            old, new = base[metric], now[metric]
+            if metric == 'throughput_per_s':
+                worse = new < old / (1 + limit) and old - new > ABSOLUTE_FLOORS[metric]
+            else:
+                worse = new > old * (1 + limit) and new - old > ABSOLUTE_FLOORS[metric]
+            if worse:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Headless Sudoku and crossword benchmarks.')
+    parser.add_argument('--seed', type=int, default=2011)
+    parser.add_argument('--repeat', type=int, default=3, help='timed passes per case; the fastest is kept')
+    parser.add_argument('--only', action='append', help='run only cases starting with this prefix (repeatable)')
+    parser.add_argument('--output', help='write results JSON here instead of stdout')
+    parser.add_argument('--compare', metavar='BASELINE', help='fail if results regress against this baseline')
+    parser.add_argument('--threshold', type=float, help='one relative threshold for every metric')
+    parser.add_argument('--save-baseline', nargs='?', const=DEFAULT_BASELINE, metavar='PATH',
+                        help=f'write results as the new baseline (default {os.path.relpath(DEFAULT_BASELINE)})')
+    args = parser.parse_args(argv)
+
+    current = run_benchmarks(args.seed, args.only, args.repeat)
+    text = json.dumps(current, indent=2, sort_keys=True) + '\n'
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text)
+    elif not args.save_baseline:
+        sys.stdout.write(text)
+    if args.save_baseline:
+        with open(args.save_baseline, 'w') as f:
+            f.write(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        for name, metric, old, new in regressions:
+            print(f'REGRESSION {name} {metric}: {old} -> {new}', file=sys.stderr)
+        if regressions:
+            return 1
+        print(f'No regressions against {args.compare}', file=sys.stderr)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Time-to-words for the crossword's Datamuse fetch, against a local mock.
+
+    python benchmarks/fetchbench.py --latency 80 --jitter 40 --slow 3000
+    python benchmarks/fetchbench.py --mode sequential --rounds 5
+
+The mock Datamuse server from tests/mock_datamuse.py runs in-process on
+a free port.  Every request waits --latency ms plus up to --jitter ms;
+the first topic of each category waits --slow ms instead, and --fail is
+the fraction of requests answered with a 500.  `concurrent` times fetch_category_words() as the
+game uses it; `sequential` times the one-topic-at-a-time loop it
+replaced.  The word cache is not used, so every round hits the mock.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+import threading
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import crossword_puzzle_random_words as crossword
+from tests.mock_datamuse import MockDatamuse, MockServer
+
+CATEGORIES = {
+    'Science': ['science', 'biology', 'chemistry', 'physics', 'astronomy'],
+    'History': ['history', 'ancient', 'medieval', 'revolution', 'civilization'],
+    'Politics': ['politics', 'government', 'democracy', 'election', 'parliament'],
+    'Geography': ['geography', 'mountain', 'river', 'ocean', 'climate'],
+}
+
+def fetch_sequential(topics, session):
+    # The fetch loop before concurrent fetching: no timeout, stop at 20 words.
+    words = []
+    for topic in topics:
+        try:
+            words.extend(crossword.request_topic_words(crossword.topic_query(topic), topic, session, None))
+        except Exception:
+            pass
+        if len(words) >= crossword.ENOUGH_WORDS:
+            break
+    return words
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark crossword word fetching against a mock Datamuse.')
+    parser.add_argument('--mode', choices=('concurrent', 'sequential'), default='concurrent')
+    parser.add_argument('--rounds', type=int, default=10, help='fetches per category')
+    parser.add_argument('--latency', type=float, default=80.0, help='base response delay, ms')
+    parser.add_argument('--jitter', type=float, default=40.0, help='extra random delay, ms')
+    parser.add_argument('--slow', type=float, default=3000.0, help='delay for the first topic of each category, ms')
+    parser.add_argument('--fail', type=float, default=0.0, help='fraction of requests answered with a 500')
+    parser.add_argument('--seed', type=int, default=2011)
+    args = parser.parse_args(argv)
+
+    random.seed(args.seed)
+    MockDatamuse.latency, MockDatamuse.jitter, MockDatamuse.slow = args.latency, args.jitter, args.slow
+    MockDatamuse.fail = args.fail
+    MockDatamuse.slow_topics = frozenset(topics[0] for topics in CATEGORIES.values())
+    server = MockServer(('127.0.0.1', 0), MockDatamuse)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    crossword.DATAMUSE_URL = f'http://127.0.0.1:{server.server_port}/words'
+
+    session = crossword.make_session()
+    executor = crossword.concurrent.futures.ThreadPoolExecutor(max_workers=crossword.FETCH_WORKERS)
+    samples = []
+    counts = []
+    try:
+        for _ in range(args.rounds):
+            for topics in CATEGORIES.values():
+                start = time.perf_counter()
+                if args.mode == 'concurrent':
+                    words = crossword.fetch_category_words(topics, None, session, executor)
+                else:
+                    words = fetch_sequential(topics, session)
+                samples.append(time.perf_counter() - start)
+                counts.append(len(words))
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+        session.close()
+        server.shutdown()
+    print(json.dumps({
+        'mode': args.mode,
+        'fetches': len(samples),
+        'p50_ms': round(percentile(samples, 50) * 1000, 1),
+        'p90_ms': round(percentile(samples, 90) * 1000, 1),
+        'max_ms': round(max(samples) * 1000, 1),
+        'min_words': min(counts),
+        'mean_words': round(sum(counts) / len(counts), 1),
+    }, indent=2))
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,144 @@
+"""Load test for `python sudoku.py serve`.
+
+    python benchmarks/loadtest.py --spawn --endpoint mix --concurrency 64 --requests 5000
+    python benchmarks/loadtest.py --port 8080 --endpoint generate --seeds 100
+
+Each client keeps one HTTP/1.1 connection open and sends requests back to
+back.  Requests/sec, latency percentiles and the status codes seen are
+printed at the end.  Generate requests cycle through --seeds seeds, so the
+service's seed cache and request coalescing get exercised.  Boards for the
+other endpoints come from the hard puzzle corpus.  --spawn starts a server
+on --port for the duration of the run.
+"""
+import argparse
+import asyncio
+import collections
+import json
+import math
+import os
+import socket
+import subprocess
+import sys
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+SUDOKU_SCRIPT = os.path.join(os.path.dirname(BENCH_DIR), 'sudoku.py')
+HARD_CORPUS = os.path.join(BENCH_DIR, 'corpora', 'sudoku_hard.txt')
+ENDPOINTS = ('generate', 'solve', 'validate', 'hint')
+
+def load_boards():
+    with open(HARD_CORPUS) as f:
+        return [line.strip() for line in f if line.strip() and not line.startswith('#')]
+
+def build_request(n, endpoint, args, boards):
+    # The n-th request of the run.  `mix` rotates through every endpoint.
+    if endpoint == 'mix':
+        endpoint = ENDPOINTS[n % len(ENDPOINTS)]
+        n //= len(ENDPOINTS)
+    if endpoint == 'generate':
+        target = f'/generate?level={args.level}'
+        if args.seeds:
+            target += f'&seed={n % args.seeds}'
+        return f'GET {target} HTTP/1.1\r\nHost: {args.host}\r\n\r\n'.encode()
+    body = json.dumps({'board': boards[n % len(boards)]}).encode()
+    return (f'POST /{endpoint} HTTP/1.1\r\nHost: {args.host}\r\nContent-Type: application/json\r\n'
+            f'Content-Length: {len(body)}\r\n\r\n').encode() + body
+
+async def read_response(reader):
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    await reader.readexactly(length)
+    return status
+
+async def client(args, boards, counter, latencies, statuses):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        while True:
+            n = next(counter)
+            if n >= args.requests:
+                break
+            start = time.perf_counter()
+            writer.write(build_request(n, args.endpoint, args, boards))
+            await writer.drain()
+            statuses[await read_response(reader)] += 1
+            latencies.append(time.perf_counter() - start)
+    finally:
+        writer.close()
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(pct / 100 * len(ordered)) - 1)]
+
+async def run_load(args):
+    boards = load_boards()
+    counter = iter(range(args.requests + args.concurrency))
+    latencies = []
+    statuses = collections.Counter()
+    start = time.perf_counter()
+    await asyncio.gather(*(client(args, boards, counter, latencies, statuses) for _ in range(args.concurrency)))
+    elapsed = time.perf_counter() - start
+    return {
+        'endpoint': args.endpoint,
+        'concurrency': args.concurrency,
+        'requests': len(latencies),
+        'seconds': round(elapsed, 3),
+        'requests_per_s': round(len(latencies) / elapsed, 1),
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p90_ms': round(percentile(latencies, 90) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'max_ms': round(max(latencies) * 1000, 2),
+        'statuses': {str(k): v for k, v in sorted(statuses.items())},
+    }
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            socket.create_connection((host, port), timeout=1).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Load test the Sudoku HTTP service.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8080)
+    parser.add_argument('--endpoint', choices=ENDPOINTS + ('mix',), default='mix')
+    parser.add_argument('--level', default='Easy')
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--seeds', type=int, default=100, help='distinct generate seeds to cycle through (0: unseeded)')
+    parser.add_argument('--spawn', action='store_true', help='start `sudoku.py serve` for the run')
+    parser.add_argument('--jobs', type=int, default=0, help='workers for the spawned server')
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        server = subprocess.Popen([sys.executable, SUDOKU_SCRIPT, 'serve', '--host', args.host,
+                                   '--port', str(args.port), '--jobs', str(args.jobs)])
+        if not wait_for_port(args.host, args.port):
+            server.terminate()
+            print('server did not start', file=sys.stderr)
+            return 1
+    try:
+        result = asyncio.run(run_load(args))
+    finally:
+        if server is not None:
+            server.terminate()
+            try:
+                server.wait(10)
+            except subprocess.TimeoutExpired:
+                server.kill()
+    print(json.dumps(result, indent=2))
+    return 0 if set(result['statuses']) <= {'200', '503'} else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,9 +1,522 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog, ttk
+import concurrent.futures
 import random
-import requests
 import json
+import os
+import queue
+import sqlite3
 import time
+import urllib.parse
+
+try:
+    import requests
+except ImportError:  # reported in __main__; layout works without it
+    requests = None
+
+DATAMUSE_URL = os.environ.get("DATAMUSE_URL", "https://api.datamuse.com/words")
+
+# Parsed Datamuse answers are cached on disk; a topic's words barely change.
+CACHE_DIR = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "crossword")
+WORD_CACHE_PATH = os.path.join(CACHE_DIR, "datamuse.sqlite3")
+WORD_CACHE_TTL = 7 * 24 * 3600
+WORD_CACHE_ENTRIES = 500
+
+# A category's topics are fetched at once.  Each request gets FETCH_TIMEOUT
+# seconds to connect and to read, the whole category FETCH_DEADLINE; the
+# fetch stops once ENOUGH_WORDS have arrived.
+FETCH_TIMEOUT = 3.0
+FETCH_DEADLINE = 5.0
+ENOUGH_WORDS = 20
+FETCH_WORKERS = 16
+
+# How often the GUI checks for results from its background worker, in ms.
+RESULT_POLL_MS = 50
+
+# compile_crossword() search: layouts kept per round, the time cap in
+# seconds, and how layouts are scored.  Placing a word outweighs any
+# amount of density, so the best layout is always one with the most words.
+COMPILE_BEAM = 8
+COMPILE_BUDGET = 0.25
+LAYOUT_WEIGHTS = {'words': 100.0, 'crossings': 10.0, 'density': 20.0, 'squareness': 5.0}
+
+FALLBACK_WORDS = {
+    'Science': [
+        {'word': 'ATOM', 'clue': 'Smallest unit of an element'},
+        {'word': 'CELL', 'clue': 'Basic unit of life'},
+        {'word': 'DNA', 'clue': 'Molecule containing genetic instructions'},
+        {'word': 'ENERGY', 'clue': 'Capacity to do work'},
+        {'word': 'GRAVITY', 'clue': 'Force that attracts objects toward Earth'},
+        {'word': 'MOLECULE', 'clue': 'Group of atoms bonded together'},
+        {'word': 'NEWTON', 'clue': 'Unit of force named after a physicist'},
+        {'word': 'OXYGEN', 'clue': 'Element essential for respiration'},
+        {'word': 'PHOTON', 'clue': 'Particle of light'},
+        {'word': 'QUANTUM', 'clue': 'Discrete packet of energy'}
+    ],
+    'History': [
+        {'word': 'ANCIENT', 'clue': 'Belonging to the very distant past'},
+        {'word': 'ARTIFACT', 'clue': 'Object made by humans of historical interest'},
+        {'word': 'CENTURY', 'clue': 'Period of 100 years'},
+        {'word': 'DYNASTY', 'clue': 'Line of hereditary rulers'},
+        {'word': 'EMPIRE', 'clue': 'Group of countries under a single authority'},
+        {'word': 'FEUDAL', 'clue': 'Relating to the Middle Ages social system'},
+        {'word': 'MEDIEVAL', 'clue': 'Relating to the Middle Ages'},
+        {'word': 'MONARCHY', 'clue': 'Form of government with a king or queen'},
+        {'word': 'REVOLUTION', 'clue': 'Forcible overthrow of a government'},
+        {'word': 'TREATY', 'clue': 'Formal agreement between states'}
+    ],
+    'Politics': [
+        {'word': 'BALLOT', 'clue': 'Paper used to cast a vote'},
+        {'word': 'CAMPAIGN', 'clue': 'Organized effort to win an election'},
+        {'word': 'CONGRESS', 'clue': 'Legislative body in the US'},
+        {'word': 'DEMOCRACY', 'clue': 'Government by the people'},
+        {'word': 'ELECTION', 'clue': 'Formal process of selecting a person for office'},
+        {'word': 'GOVERNMENT', 'clue': 'Group that controls and makes decisions for a country'},
+        {'word': 'IDEOLOGY', 'clue': 'System of ideas and ideals'},
+        {'word': 'JUSTICE', 'clue': 'Fair treatment or behavior'},
+        {'word': 'LAW', 'clue': 'System of rules enforced by a society'},
+        {'word': 'LOBBY', 'clue': 'Group that tries to influence legislation'}
+    ],
+    'Geography': [
+        {'word': 'ATLAS', 'clue': 'Book of maps'},
+        {'word': 'CANYON', 'clue': 'Deep gorge between cliffs'},
+        {'word': 'CLIMATE', 'clue': 'Weather conditions of an area'},
+        {'word': 'CONTINENT', 'clue': 'Large landmass on Earth'},
+        {'word': 'DESERT', 'clue': 'Arid land with little rainfall'},
+        {'word': 'EQUATOR', 'clue': 'Imaginary line dividing Earth into Northern and Southern Hemispheres'},
+        {'word': 'GLACIER', 'clue': 'Slowly moving mass of ice'},
+        {'word': 'HEMISPHERE', 'clue': 'Half of the Earth'},
+        {'word': 'ISLAND', 'clue': 'Land surrounded by water'},
+        {'word': 'JUNGLE', 'clue': 'Dense tropical forest'}
+    ]
+}
+
+def topic_query(topic):
+    """Datamuse query for words meaning `topic`, with definitions"""
+    return DATAMUSE_URL + "?" + urllib.parse.urlencode({"ml": topic, "md": "d", "max": 40})
+
+def parse_topic_words(data, topic):
+    """Word/clue records for the usable words in a Datamuse response"""
+    words_with_clues = []
+    for item in data:
+        # Check if the word has a definition and is appropriate length
+        if ('defs' in item and
+            len(item['word']) >= 3 and
+            len(item['word']) <= 10 and
+            ' ' not in item['word'] and  # No spaces
+            "'" not in item['word']):    # No apostrophes
+
+            word = item['word'].upper()
+            # Get the first definition
+            definition = item['defs'][0].split('\t')[1] if item['defs'] else f"Related to {topic}"
+
+            # Capitalize first letter of definition
+            definition = definition[0].upper() + definition[1:]
+
+            words_with_clues.append({
+                'word': word,
+                'clue': definition
+            })
+    return words_with_clues
+
+class WordCache:
+    """Parsed Datamuse results in an SQLite file, keyed by query URL.
+
+    get() returns records younger than `ttl` seconds, so a repeat game
+    needs no request and no JSON parsing.  get_stale() returns them at any
+    age, for when the network is down.  Past `capacity` entries the least
+    recently used are dropped.  If the file cannot be opened the cache
+    lives in memory for the session.  The cache may be created on one
+    thread and used on another, but only one thread may use it at a time.
+    """
+
+    def __init__(self, path=WORD_CACHE_PATH, ttl=WORD_CACHE_TTL, capacity=WORD_CACHE_ENTRIES):
+        self.ttl = ttl
+        self.capacity = capacity
+        self.hits = self.misses = self.stale_hits = 0
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.db = self.connect(path)
+        except (OSError, sqlite3.Error) as e:
+            print(f"Word cache unavailable, using memory: {e}")
+            self.db = self.connect(":memory:")
+
+    def connect(self, path):
+        db = sqlite3.connect(path, check_same_thread=False)
+        db.execute("CREATE TABLE IF NOT EXISTS words "
+                   "(query TEXT PRIMARY KEY, records TEXT, fetched REAL, used REAL)")
+        return db
+
+    def lookup(self, query, max_age):
+        row = self.db.execute("SELECT records, fetched FROM words WHERE query = ?", (query,)).fetchone()
+        now = time.time()
+        if row is None or (max_age is not None and now - row[1] > max_age):
+            return None
+        # Committed with the next put() or close(); losing it only ages the entry.
+        self.db.execute("UPDATE words SET used = ? WHERE query = ?", (now, query))
+        return json.loads(row[0])
+
+    def get(self, query):
+        records = self.lookup(query, self.ttl)
+        if records is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return records
+
+    def get_stale(self, query):
+        records = self.lookup(query, None)
+        if records is not None:
+            self.stale_hits += 1
+        return records
+
+    def put(self, query, records):
+        now = time.time()
+        self.db.execute("INSERT OR REPLACE INTO words VALUES (?, ?, ?, ?)",
+                        (query, json.dumps(records), now, now))
+        self.db.execute("DELETE FROM words WHERE query NOT IN "
+                        "(SELECT query FROM words ORDER BY used DESC LIMIT ?)", (self.capacity,))
+        self.db.commit()
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'stale_hits': self.stale_hits}
+
+    def close(self):
+        self.db.commit()
+        self.db.close()
+
+def make_session(pool_size=FETCH_WORKERS):
+    """requests session keeping up to pool_size connections alive"""
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+def request_topic_words(query, topic, session=None, timeout=FETCH_TIMEOUT):
+    """Fetch and parse one Datamuse query; raises on any failure"""
+    response = (session or requests).get(query, timeout=timeout)
+    response.raise_for_status()
+    return parse_topic_words(response.json(), topic)
+
+def fetch_category_words(topics, cache=None, session=None, executor=None,
+                         enough=ENOUGH_WORDS, timeout=FETCH_TIMEOUT, deadline=FETCH_DEADLINE, abort=None):
+    """Word/clue records for a list of topics.
+
+    Fresh cache entries are used first.  The other topics are requested
+    together on `executor` and their records taken as they arrive, until
+    there are `enough` words or `deadline` seconds have passed.  Requests
+    not yet started are then cancelled; ones in flight end within
+    `timeout` and are ignored.  A topic that fails or misses the deadline
+    falls back to its stale cache entry.  The wait also ends as soon as
+    `abort`, a Future, is done.  The cache is only touched from the
+    calling thread.
+    """
+    words = []
+    queries = {}
+    for topic in topics:
+        query = topic_query(topic)
+        records = cache.get(query) if cache is not None else None
+        if records is None:
+            queries[query] = topic
+        else:
+            words.extend(records)
+    if len(words) >= enough or not queries:
+        return words
+
+    own_executor = executor is None
+    if own_executor:
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(queries))
+    pending = {executor.submit(request_topic_words, query, topic, session, timeout): query
+               for query, topic in queries.items()}
+    end = time.monotonic() + deadline
+    failed = []
+    try:
+        while pending and len(words) < enough:
+            waited = list(pending) if abort is None else [abort, *pending]
+            done, _ = concurrent.futures.wait(waited, timeout=max(0, end - time.monotonic()),
+                                              return_when=concurrent.futures.FIRST_COMPLETED)
+            if not done or abort in done:
+                break
+            for future in done:
+                query = pending.pop(future)
+                try:
+                    records = future.result()
+                except Exception as e:
+                    print(f"Error fetching words for {queries[query]}: {e}")
+                    failed.append(query)
+                    continue
+                if cache is not None:
+                    cache.put(query, records)
+                words.extend(records)
+    finally:
+        for future in pending:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    # Old words beat no words when the network is down or slow.
+    if cache is not None and len(words) < enough:
+        for query in failed + list(pending.values()):
+            records = cache.get_stale(query)
+            if records is not None:
+                words.extend(records)
+    return words
+
+class Placement:
+    """A placed word, running across or down from (row, col)"""
+    __slots__ = ('word', 'clue', 'row', 'col', 'across')
+
+    def __init__(self, word, clue, row, col, across):
+        self.word = word
+        self.clue = clue
+        self.row = row
+        self.col = col
+        self.across = across
+
+    def as_dict(self):
+        return {
+            'word': self.word,
+            'clue': self.clue,
+            'row': self.row,
+            'col': self.col,
+            'direction': 'across' if self.across else 'down'
+        }
+
+class CrosswordGrid:
+    """Square grid of letters for laying out words.
+
+    Letters are kept in one flat list, row by row.  row_bits[r] has bit c
+    set when cell (r, c) holds a letter, and col_bits[c] has bit r set, so
+    a span of cells can be tested for letters with one mask.  across_bits
+    and down_bits do the same for the cells covered by across and by down
+    words.  `shared` counts cells in two words, `letters` filled cells;
+    with the bounding box they feed score().
+    `index` maps
+    each letter to the (row, col, across) crossings a new word could use:
+    one per letter of every placed word, in placement order, with `across`
+    the direction the new word would run.
+    """
+    __slots__ = ('size', 'cells', 'row_bits', 'col_bits', 'across_bits', 'down_bits', 'index',
+                 'placements', 'shared', 'letters', 'top', 'bottom', 'left', 'right')
+
+    def __init__(self, size):
+        self.size = size
+        self.cells = [None] * (size * size)
+        self.row_bits = [0] * size
+        self.col_bits = [0] * size
+        self.across_bits = [0] * size
+        self.down_bits = [0] * size
+        self.index = {}
+        self.placements = []
+        self.shared = self.letters = 0
+        self.top = self.left = size
+        self.bottom = self.right = -1
+
+    def copy(self):
+        grid = CrosswordGrid.__new__(CrosswordGrid)
+        grid.size = self.size
+        grid.cells = self.cells[:]
+        grid.row_bits = self.row_bits[:]
+        grid.col_bits = self.col_bits[:]
+        grid.across_bits = self.across_bits[:]
+        grid.down_bits = self.down_bits[:]
+        grid.index = {char: entries[:] for char, entries in self.index.items()}
+        grid.placements = self.placements[:]
+        grid.shared, grid.letters = self.shared, self.letters
+        grid.top, grid.bottom, grid.left, grid.right = self.top, self.bottom, self.left, self.right
+        return grid
+
+    def legal(self, word, row, col, across):
+        """Letters word would cross at (row, col) under crossword rules, or -1.
+
+        Every letter it shares with the grid must match, the cells just
+        before and after the word must be empty, it may only cross words
+        running the other way, and none of its new letters may sit beside
+        another letter.
+        """
+        size = self.size
+        n = len(word)
+        if across:
+            lines, covered, cols = self.row_bits, self.across_bits, self.col_bits
+            line, offset = row, col
+        else:
+            lines, covered, cols = self.col_bits, self.down_bits, self.row_bits
+            line, offset = col, row
+        if line < 0 or line >= size or offset < 0 or offset + n > size:
+            return -1
+        span = ((1 << n) - 1) << offset
+        bits = lines[line]
+        if covered[line] & span or bits & (span << 1 | span >> 1) & ~span:
+            return -1
+        fresh = span & ~bits
+        if line > 0 and lines[line - 1] & fresh or line < size - 1 and lines[line + 1] & fresh:
+            return -1
+        occupied = (bits & span) >> offset
+        crossed = 0
+        cells = self.cells
+        step = 1 if across else size
+        start = row * size + col
+        while occupied:
+            low = occupied & -occupied
+            k = low.bit_length() - 1
+            if cells[start + k * step] != word[k]:
+                return -1
+            crossed += 1
+            occupied ^= low
+        return crossed
+
+    def score(self, words=None, shared=None, letters=None, box=None):
+        """Layout score, or what it would be with the given totals"""
+        words = len(self.placements) if words is None else words
+        if not words:
+            return 0.0
+        top, bottom, left, right = box or (self.top, self.bottom, self.left, self.right)
+        height, width = bottom - top + 1, right - left + 1
+        return (LAYOUT_WEIGHTS['words'] * words
+                + LAYOUT_WEIGHTS['crossings'] * (self.shared if shared is None else shared)
+                + LAYOUT_WEIGHTS['density'] * (self.letters if letters is None else letters) / (height * width)
+                + LAYOUT_WEIGHTS['squareness'] * min(height, width) / max(height, width))
+
+    def score_with(self, word, row, col, across, crossed):
+        """score() after placing word, which legal() said crosses `crossed` letters"""
+        n = len(word)
+        end_row, end_col = (row, col + n - 1) if across else (row + n - 1, col)
+        box = (min(self.top, row), max(self.bottom, end_row), min(self.left, col), max(self.right, end_col))
+        return self.score(len(self.placements) + 1, self.shared + crossed,
+                          self.letters + n - crossed, box)
+
+    def place(self, placement):
+        size = self.size
+        word, row, col, across = placement.word, placement.row, placement.col, placement.across
+        n = len(word)
+        start = row * size + col
+        index = self.index
+        crossed = bin(((self.row_bits[row] >> col) if across else (self.col_bits[col] >> row))
+                      & ((1 << n) - 1)).count('1')
+        self.shared += crossed
+        self.letters += n - crossed
+        self.top, self.left = min(self.top, row), min(self.left, col)
+        if across:
+            self.bottom, self.right = max(self.bottom, row), max(self.right, col + n - 1)
+            self.across_bits[row] |= ((1 << n) - 1) << col
+            self.cells[start:start + n] = word
+            self.row_bits[row] |= ((1 << n) - 1) << col
+            for k, char in enumerate(word):
+                self.col_bits[col + k] |= 1 << row
+                index.setdefault(char, []).append((row, col + k, False))
+        else:
+            self.bottom, self.right = max(self.bottom, row + n - 1), max(self.right, col)
+            self.down_bits[col] |= ((1 << n) - 1) << row
+            self.cells[start:start + n * size:size] = word
+            self.col_bits[col] |= ((1 << n) - 1) << row
+            for k, char in enumerate(word):
+                self.row_bits[row + k] |= 1 << col
+                index.setdefault(char, []).append((row + k, col, True))
+        self.placements.append(placement)
+
+    def crossings(self, word):
+        """Start cells where word crosses a placed word, as (row, col, across)"""
+        index = self.index
+        for j, char in enumerate(word):
+            for row, col, across in index.get(char, ()):
+                if across:
+                    yield row, col - j, True
+                else:
+                    yield row - j, col, False
+
+def compile_crossword(word_list, grid_size=12, word_count=6, time_budget=COMPILE_BUDGET,
+                      beam_width=COMPILE_BEAM, rng=random):
+    """Search for a well-filled layout of up to word_count words.
+
+    A beam search: each round extends every kept layout by one legal
+    placement (see CrosswordGrid.legal) of each unused word, and keeps the
+    beam_width best by score.  When the rounds still needed would overrun
+    time_budget at the current width, the beam narrows, down to a single
+    best-first layout.  The search ends when word_count words are placed,
+    nothing more fits or the time is up.  Returns the best layout seen, as
+    dicts with word, clue, row, col and direction, and a stats dict.  Stats count the
+    placements checked and the legal layouts evaluated, with throughput;
+    `complete` is False if fewer than word_count words could be placed.
+    """
+    start = time.perf_counter()
+    deadline = start + time_budget
+    # One entry per distinct word that can fit at all, in random order.
+    words = list({w['word']: w for w in word_list if 3 <= len(w['word']) <= grid_size}.values())
+    rng.shuffle(words)
+
+    beam = []
+    for i, word_data in enumerate(words[:beam_width]):
+        grid = CrosswordGrid(grid_size)
+        word = word_data['word']
+        grid.place(Placement(word, word_data['clue'], grid_size // 2, (grid_size - len(word)) // 2, True))
+        beam.append((grid.score(), frozenset([i]), grid))
+    best = max(beam, key=lambda state: state[0], default=(0.0, frozenset(), CrosswordGrid(grid_size)))
+    evaluated = checked = len(beam)
+    rounds = 1
+    width = beam_width
+    out_of_time = False
+
+    while beam and len(best[2].placements) < word_count and not out_of_time:
+        round_start = time.perf_counter()
+        candidates = []
+        for position, (_, used, grid) in enumerate(beam):
+            if time.perf_counter() > deadline:
+                out_of_time = True
+                break
+            for i, word_data in enumerate(words):
+                if i in used:
+                    continue
+                word = word_data['word']
+                for row, col, across in grid.crossings(word):
+                    checked += 1
+                    crossed = grid.legal(word, row, col, across)
+                    if crossed > 0:
+                        evaluated += 1
+                        candidates.append((grid.score_with(word, row, col, across, crossed),
+                                           position, i, row, col, across))
+        # Different orders can reach the same layout; keep one of each.
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+        seen = set()
+        next_beam = []
+        for score, position, i, row, col, across in candidates:
+            _, used, grid = beam[position]
+            key = frozenset((p.word, p.row, p.col, p.across) for p in grid.placements) | {(words[i]['word'], row, col, across)}
+            if key in seen:
+                continue
+            seen.add(key)
+            child = grid.copy()
+            child.place(Placement(words[i]['word'], words[i]['clue'], row, col, across))
+            next_beam.append((score, used | {i}, child))
+            if len(next_beam) == width:
+                break
+        rounds += 1
+        if next_beam and next_beam[0][0] > best[0]:
+            best = next_beam[0]
+
+        now = time.perf_counter()
+        per_layout = (now - round_start) / len(beam)
+        remaining = word_count - len(best[2].placements)
+        if remaining > 0:
+            width = max(1, min(beam_width, int((deadline - now) / (remaining * per_layout))))
+        beam = next_beam
+
+    score, _, grid = best
+    elapsed = time.perf_counter() - start
+    stats = {
+        'placed': len(grid.placements),
+        'requested': word_count,
+        'complete': len(grid.placements) >= word_count,
+        'crossings': grid.shared,
+        'score': round(score, 2),
+        'checked': checked,
+        'evaluated': evaluated,
+        'rounds': rounds,
+        'seconds': round(elapsed, 4),
+        'per_second': round(evaluated / elapsed) if elapsed else 0,
+        'out_of_time': out_of_time,
+    }
+    return [placement.as_dict() for placement in grid.placements], stats
 
 class CrosswordPuzzle:
     def __init__(self, root):
@@ -32,60 +545,52 @@ class CrosswordPuzzle:
         # Number of words to include in the puzzle
         self.word_count = 6  # Default to 6 words for quick games
         
+        # Words are fetched and puzzles laid out on the loader thread, which
+        # alone uses the word cache.  Results come back through self.results,
+        # polled from the Tk loop; word_pools keeps each category's words so
+        # a later game in that category skips the fetch.  One category is
+        # prefetched at a time, so a layout never queues behind several.
+        self.word_cache = WordCache()
+        self.session = make_session()
+        self.fetcher = concurrent.futures.ThreadPoolExecutor(max_workers=FETCH_WORKERS)
+        self.loader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.results = queue.Queue()
+        self.word_pools = {}
+        self.prefetching = None
+        self.request = 0
+        # Done once the window closes; loads still running then stop early.
+        self.abort = concurrent.futures.Future()
+
         # Status label for feedback
         self.status_var = tk.StringVar()
         self.status_var.set("Ready")
         
         self.create_widgets()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
         self.fetch_words_and_generate()
+        self.poll_results()
+
+    def close(self):
+        # A running load stops waiting for the network and queued ones
+        # return at once.  The session and cache are closed on the loader
+        # thread after them, so nothing is closed under a load and the
+        # window does not wait.
+        self.abort.set_result(None)
+        self.fetcher.shutdown(wait=False, cancel_futures=True)
+        self.loader.submit(self.close_connections)
+        self.loader.shutdown(wait=False)
+        self.root.destroy()
+
+    def close_connections(self):
+        self.session.close()
+        self.word_cache.close()
         
     def fetch_words_for_category(self, category):
-        """Fetch random words related to a category using Datamuse API"""
-        words_with_clues = []
+        """Fetch random words related to a category using Datamuse API (loader thread)"""
         topics = self.categories[category]
-        
-        # Update status
-        self.status_var.set(f"Fetching words for {category}...")
-        self.root.update()
-        
-        # Try each topic until we get enough words
-        for topic in topics:
-            try:
-                # Get words related to the topic
-                response = requests.get(
-                    f"https://api.datamuse.com/words?ml={topic}&md=d&max=40"
-                )
-                
-                if response.status_code == 200:
-                    data = response.json()
-                    
-                    for item in data:
-                        # Check if the word has a definition and is appropriate length
-                        if ('defs' in item and 
-                            len(item['word']) >= 3 and 
-                            len(item['word']) <= 10 and
-                            ' ' not in item['word'] and  # No spaces
-                            "'" not in item['word']):    # No apostrophes
-                            
-                            word = item['word'].upper()
-                            # Get the first definition
-                            definition = item['defs'][0].split('\t')[1] if item['defs'] else f"Related to {topic}"
-                            
-                            # Capitalize first letter of definition
-                            definition = definition[0].upper() + definition[1:]
-                            
-                            words_with_clues.append({
-                                'word': word,
-                                'clue': definition
-                            })
-                
-                # If we have enough words, break
-                if len(words_with_clues) >= 20:
-                    break
-                    
-            except Exception as e:
-                print(f"Error fetching words: {e}")
-        
+        words_with_clues = fetch_category_words(topics, self.word_cache, self.session, self.fetcher,
+                                                abort=self.abort)
+
         # If we couldn't get enough words, add some fallback words
         if len(words_with_clues) < 10:
             fallback_words = self.get_fallback_words(category)
@@ -97,209 +602,105 @@ class CrosswordPuzzle:
     
     def get_fallback_words(self, category):
         """Provide fallback words in case the API fails"""
-        fallback = {
-            'Science': [
-                {'word': 'ATOM', 'clue': 'Smallest unit of an element'},
-                {'word': 'CELL', 'clue': 'Basic unit of life'},
-                {'word': 'DNA', 'clue': 'Molecule containing genetic instructions'},
-                {'word': 'ENERGY', 'clue': 'Capacity to do work'},
-                {'word': 'GRAVITY', 'clue': 'Force that attracts objects toward Earth'},
-                {'word': 'MOLECULE', 'clue': 'Group of atoms bonded together'},
-                {'word': 'NEWTON', 'clue': 'Unit of force named after a physicist'},
-                {'word': 'OXYGEN', 'clue': 'Element essential for respiration'},
-                {'word': 'PHOTON', 'clue': 'Particle of light'},
-                {'word': 'QUANTUM', 'clue': 'Discrete packet of energy'}
-            ],
-            'History': [
-                {'word': 'ANCIENT', 'clue': 'Belonging to the very distant past'},
-                {'word': 'ARTIFACT', 'clue': 'Object made by humans of historical interest'},
-                {'word': 'CENTURY', 'clue': 'Period of 100 years'},
-                {'word': 'DYNASTY', 'clue': 'Line of hereditary rulers'},
-                {'word': 'EMPIRE', 'clue': 'Group of countries under a single authority'},
-                {'word': 'FEUDAL', 'clue': 'Relating to the Middle Ages social system'},
-                {'word': 'MEDIEVAL', 'clue': 'Relating to the Middle Ages'},
-                {'word': 'MONARCHY', 'clue': 'Form of government with a king or queen'},
-                {'word': 'REVOLUTION', 'clue': 'Forcible overthrow of a government'},
-                {'word': 'TREATY', 'clue': 'Formal agreement between states'}
-            ],
-            'Politics': [
-                {'word': 'BALLOT', 'clue': 'Paper used to cast a vote'},
-                {'word': 'CAMPAIGN', 'clue': 'Organized effort to win an election'},
-                {'word': 'CONGRESS', 'clue': 'Legislative body in the US'},
-                {'word': 'DEMOCRACY', 'clue': 'Government by the people'},
-                {'word': 'ELECTION', 'clue': 'Formal process of selecting a person for office'},
-                {'word': 'GOVERNMENT', 'clue': 'Group that controls and makes decisions for a country'},
-                {'word': 'IDEOLOGY', 'clue': 'System of ideas and ideals'},
-                {'word': 'JUSTICE', 'clue': 'Fair treatment or behavior'},
-                {'word': 'LAW', 'clue': 'System of rules enforced by a society'},
-                {'word': 'LOBBY', 'clue': 'Group that tries to influence legislation'}
-            ],
-            'Geography': [
-                {'word': 'ATLAS', 'clue': 'Book of maps'},
-                {'word': 'CANYON', 'clue': 'Deep gorge between cliffs'},
-                {'word': 'CLIMATE', 'clue': 'Weather conditions of an area'},
-                {'word': 'CONTINENT', 'clue': 'Large landmass on Earth'},
-                {'word': 'DESERT', 'clue': 'Arid land with little rainfall'},
-                {'word': 'EQUATOR', 'clue': 'Imaginary line dividing Earth into Northern and Southern Hemispheres'},
-                {'word': 'GLACIER', 'clue': 'Slowly moving mass of ice'},
-                {'word': 'HEMISPHERE', 'clue': 'Half of the Earth'},
-                {'word': 'ISLAND', 'clue': 'Land surrounded by water'},
-                {'word': 'JUNGLE', 'clue': 'Dense tropical forest'}
-            ]
-        }
-        
-        return fallback.get(category, [])
+        return FALLBACK_WORDS.get(category, [])
     
     def fetch_words_and_generate(self):
-        """Fetch words and generate the crossword"""
+        """Start a puzzle for the current subject; the window stays responsive"""
+        self.request += 1
+        words = self.word_pools.get(self.current_subject)
+        if words is None:
+            self.status_var.set(f"Fetching words for {self.current_subject}...")
+        else:
+            self.status_var.set(f"Laying out {self.current_subject} puzzle...")
+        self.progress.pack(side=tk.LEFT, padx=5)
+        self.progress.start(15)
+        self.loader.submit(self.load_puzzle, self.request, self.current_subject,
+                           self.crossword_data['size'], self.word_count, words)
+
+    def load_puzzle(self, request, category, size, word_count, words=None):
+        """Fetch words unless given, and lay out a puzzle, on the loader thread"""
+        if self.abort.done():
+            return
         try:
-            # Fetch words for the current subject
-            words = self.fetch_words_for_category(self.current_subject)
-            
-            # Generate the crossword
-            self.generate_crossword(words)
-            
+            if words is None:
+                words = self.fetch_words_for_category(category)
+            layout = compile_crossword(list(words), size, word_count)
+        except Exception as e:
+            self.results.put(('error', request, category, e))
+            return
+        self.results.put(('puzzle', request, category, (words, layout)))
+
+    def prefetch_words(self, category):
+        """Fill a category's word pool on the loader thread"""
+        if self.abort.done():
+            return
+        try:
+            self.results.put(('words', None, category, self.fetch_words_for_category(category)))
+        except Exception as e:
+            self.results.put(('words', None, category, None))
+            print(f"Error prefetching words for {category}: {e}")
+
+    def poll_results(self):
+        """Apply results from the loader thread; runs on the Tk loop"""
+        while True:
+            try:
+                kind, request, category, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if kind == 'words':
+                self.prefetching = None
+                if value is not None:
+                    self.word_pools.setdefault(category, value)
+                    self.prefetch_next()
+            elif kind == 'puzzle':
+                words, layout = value
+                self.word_pools[category] = words
+                if request == self.request:
+                    self.finish_loading()
+                    self.show_puzzle(layout)
+            elif request == self.request:
+                self.finish_loading()
+                messagebox.showerror("Error", f"Failed to generate puzzle: {str(value)}")
+                self.status_var.set("Error generating puzzle")
+        self.root.after(RESULT_POLL_MS, self.poll_results)
+
+    def finish_loading(self):
+        self.progress.stop()
+        self.progress.pack_forget()
+
+    def show_puzzle(self, layout):
+        """Draw a puzzle laid out on the loader thread, then prefetch the other categories"""
+        try:
+            self.crossword_data['words'], self.layout_stats = layout
+
             # Create the grid and clues
             self.create_crossword_grid()
             self.create_clues_panel()
-            
+
             # Update status
-            self.status_var.set(f"Ready - {self.current_subject} puzzle with 6 words")
-            
+            cache = self.word_cache.stats()
+            layout = self.layout_stats
+            placed = f"{layout['placed']}" if layout['complete'] else f"only {layout['placed']} of {self.word_count}"
+            self.status_var.set(f"Ready - {self.current_subject} puzzle with {placed} words "
+                                f"(word cache: {cache['hits']} hits, {cache['misses']} misses; "
+                                f"layout: {layout['evaluated']} layouts at {layout['per_second']}/s)")
+
         except Exception as e:
             messagebox.showerror("Error", f"Failed to generate puzzle: {str(e)}")
             self.status_var.set("Error generating puzzle")
-    
-    def generate_crossword(self, word_list):
-        """Generate a random crossword puzzle based on the provided word list"""
-        grid_size = self.crossword_data['size']
-        grid = [[None for _ in range(grid_size)] for _ in range(grid_size)]
-        
-        # Shuffle the word list to get random words
-        random.shuffle(word_list)
-        selected_words = []
-        
-        # Place the first word in the middle horizontally
-        first_word = word_list[0]['word']
-        first_word_row = grid_size // 2
-        first_word_col = (grid_size - len(first_word)) // 2
-        
-        # Add the first word
-        for i, char in enumerate(first_word):
-            grid[first_word_row][first_word_col + i] = char
-        
-        selected_words.append({
-            'word': first_word,
-            'clue': word_list[0]['clue'],
-            'row': first_word_row,
-            'col': first_word_col,
-            'direction': 'across'
-        })
-        
-        # Try to place more words
-        for word_data in word_list[1:]:
-            if len(selected_words) >= self.word_count:  # Limit to specified word count
-                break
-                
-            word = word_data['word']
-            placed = False
-            
-            # Try to place the word vertically first
-            for existing_word in selected_words:
-                if existing_word['direction'] == 'across':
-                    for i, char in enumerate(existing_word['word']):
-                        for j, new_char in enumerate(word):
-                            if char == new_char:
-                                # Try to place the word vertically through this intersection
-                                row = existing_word['row']
-                                col = existing_word['col'] + i
-                                start_row = row - j
-                                
-                                # Check if the word fits
-                                if start_row >= 0 and start_row + len(word) <= grid_size:
-                                    can_place = True
-                                    
-                                    # Check if the placement is valid
-                                    for k, c in enumerate(word):
-                                        r = start_row + k
-                                        # Skip the intersection point
-                                        if r == row:
-                                            continue
-                                        # Check if the cell is empty or has the same character
-                                        if grid[r][col] is not None and grid[r][col] != c:
-                                            can_place = False
-                                            break
-                                    
-                                    if can_place:
-                                        # Place the word
-                                        for k, c in enumerate(word):
-                                            r = start_row + k
-                                            grid[r][col] = c
-                                        
-                                        selected_words.append({
-                                            'word': word,
-                                            'clue': word_data['clue'],
-                                            'row': start_row,
-                                            'col': col,
-                                            'direction': 'down'
-                                        })
-                                        placed = True
-                                        break
-                            if placed:
-                                break
-                        if placed:
-                            break
-                
-                # Try to place the word horizontally
-                elif existing_word['direction'] == 'down' and not placed:
-                    for i, char in enumerate(existing_word['word']):
-                        for j, new_char in enumerate(word):
-                            if char == new_char:
-                                # Try to place the word horizontally through this intersection
-                                row = existing_word['row'] + i
-                                col = existing_word['col']
-                                start_col = col - j
-                                
-                                # Check if the word fits
-                                if start_col >= 0 and start_col + len(word) <= grid_size:
-                                    can_place = True
-                                    
-                                    # Check if the placement is valid
-                                    for k, c in enumerate(word):
-                                        c_col = start_col + k
-                                        # Skip the intersection point
-                                        if c_col == col:
-                                            continue
-                                        # Check if the cell is empty or has the same character
-                                        if grid[row][c_col] is not None and grid[row][c_col] != c:
-                                            can_place = False
-                                            break
-                                    
-                                    if can_place:
-                                        # Place the word
-                                        for k, c in enumerate(word):
-                                            c_col = start_col + k
-                                            grid[row][c_col] = c
-                                        
-                                        selected_words.append({
-                                            'word': word,
-                                            'clue': word_data['clue'],
-                                            'row': row,
-                                            'col': start_col,
-                                            'direction': 'across'
-                                        })
-                                        placed = True
-                                        break
-                            if placed:
-                                break
-                        if placed:
-                            break
-                
-                if placed:
-                    break
-        
-        # Update the crossword data
-        self.crossword_data['words'] = selected_words
+
+        # Speculatively fetch the other categories so picking one is quick.
+        self.prefetch_next()
+
+    def prefetch_next(self):
+        """Start fetching the next category without a word pool, unless one is running"""
+        if self.prefetching is not None:
+            return
+        for category in self.categories:
+            if category not in self.word_pools:
+                self.prefetching = category
+                self.loader.submit(self.prefetch_words, category)
+                return
     
     def create_widgets(self):
         # Main frame to hold everything
@@ -323,6 +724,9 @@ class CrosswordPuzzle:
         status_label = tk.Label(self.control_panel, textvariable=self.status_var, 
                                font=('Arial', 10), fg='gray')
         status_label.pack(side=tk.LEFT, padx=20)
+
+        # Shown while words are being fetched
+        self.progress = ttk.Progressbar(self.control_panel, mode='indeterminate', length=120)
         
         # New Game button
         self.new_game_button = tk.Button(self.control_panel, text="New Game", 
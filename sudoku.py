@@ -1,106 +1,2863 @@
-import tkinter as tk
-from tkinter import messagebox
-from tkinter import ttk
-from PIL import Image, ImageTk
+import argparse
+import asyncio
+import collections
+import concurrent.futures
+import contextlib
+import hashlib
+import itertools
+import json
+import math
+import mmap
+import multiprocessing
+import operator
 import random
-import copy
 import os
+import signal
+import struct
+import sys
+import time
+import urllib.parse
+
+# Reference point for `--startup-timing`.
+PROCESS_START = time.perf_counter()
+
+# tkinter and PIL are only needed by SudokuGUI; load_gui_modules() imports
+# them so headless commands such as `python sudoku.py generate` never do.
+# PIL is left until the first background image is decoded.
+tk = messagebox = ttk = Image = ImageTk = None
+
+def load_gui_modules():
+    global tk, messagebox, ttk
+    import tkinter as tk
+    from tkinter import messagebox
+    from tkinter import ttk
+
+def load_image_modules():
+    global Image, ImageTk
+    if Image is None:
+        from PIL import Image, ImageTk
+
+# NumPy is optional: only the batch grading API uses it.
+np = None
+
+def load_numpy():
+    global np
+    if np is None:
+        try:
+            import numpy as np
+        except ImportError:
+            return False
+    return True
+
+# Cell geometry and bitmask tables for the candidate engine.  Digit d is
+# stored as bit (1 << d), so a full unit has mask ALL_DIGITS.
+ALL_DIGITS = 0x3FE
+CELL_ROW = [i // 9 for i in range(81)]
+CELL_COL = [i % 9 for i in range(81)]
+CELL_BOX = [(i // 27) * 3 + (i % 9) // 3 for i in range(81)]
+ROW_UNITS = [[r * 9 + c for c in range(9)] for r in range(9)]
+COL_UNITS = [[r * 9 + c for r in range(9)] for c in range(9)]
+BOX_UNITS = [[i for i in range(81) if CELL_BOX[i] == b] for b in range(9)]
+POPCOUNT = [bin(m).count('1') for m in range(1024)]
+MASK_DIGITS = [tuple(d for d in range(1, 10) if m >> d & 1) for m in range(1024)]
+BIT_DIGIT = {1 << d: d for d in range(1, 10)}
+LEVEL_REMOVALS = {'Easy': 35, 'Medium': 45, 'Challenging': 55}
+# Share of cells removed per level on 16x16 and 25x25 boards, by box size.
+# Proving a 16x16 puzzle unique gets expensive past roughly 58% holes, a
+# 25x25 one past roughly 47%.
+LARGE_LEVEL_HOLES = {
+    4: {'Easy': 0.40, 'Medium': 0.48, 'Challenging': 0.55},
+    5: {'Easy': 0.38, 'Medium': 0.43, 'Challenging': 0.46},
+}
+# Search nodes a carve's dancing-links solution count may use before the
+# removal is given up as not provably unique.
+COUNT_NODE_BUDGET = 20000
+BOARD_SIZES = {'9x9': 3, '16x16': 4, '25x25': 5}
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'sudoku')
+IMAGE_CACHE_DIR = os.path.join(CACHE_DIR, 'backgrounds')
+# Ready puzzles the GUI's buffer held at exit, for an instant first game.
+BUFFER_CACHE_PATH = os.path.join(CACHE_DIR, 'puzzles.json')
+
+PEERS = [tuple(sorted(set(ROW_UNITS[CELL_ROW[i]] + COL_UNITS[CELL_COL[i]] + BOX_UNITS[CELL_BOX[i]]) - {i})) for i in range(81)]
+ALL_UNITS = ROW_UNITS + COL_UNITS + BOX_UNITS
+
+def box_line_intersections():
+    # (segment, rest of line, rest of box) for every box/row and box/column
+    # crossing, as used by locked candidates.
+    result = []
+    for box in BOX_UNITS:
+        for line in {tuple(ROW_UNITS[CELL_ROW[i]]) for i in box} | {tuple(COL_UNITS[CELL_COL[i]]) for i in box}:
+            segment = [i for i in line if i in box]
+            result.append((segment, [i for i in line if i not in box], [i for i in box if i not in line]))
+    return result
+
+BOX_LINE_INTERSECTIONS = box_line_intersections()
+
+# Human techniques, easiest first, with Sudoku Explainer style ratings.  A
+# puzzle's score is the rating of the hardest technique it needed, or
+# GUESS_RATING when these techniques alone cannot finish it.
+TECHNIQUES = [
+    ('hidden single', 1.5, 'hidden_singles', ()),
+    ('naked single', 2.3, 'naked_singles', ()),
+    ('locked candidates', 2.6, 'locked_candidates', ()),
+    ('naked pair', 3.0, 'naked_subsets', (2,)),
+    ('x-wing', 3.2, 'x_wings', ()),
+    ('hidden pair', 3.4, 'hidden_subsets', (2,)),
+    ('naked triple', 3.6, 'naked_subsets', (3,)),
+    ('hidden triple', 4.0, 'hidden_subsets', (3,)),
+]
+GUESS_RATING = 10.0
+# Score band and hole count per level for graded generation.  Medium
+# rarely reaches its score floor with fewer than 52 holes.
+LEVEL_SCORES = {'Easy': (0.0, 1.5), 'Medium': (2.3, 2.6), 'Challenging': (3.0, 4.0)}
+LEVEL_HOLES = {'Easy': 40, 'Medium': 52, 'Challenging': 57}
+# Removals graded together while carving a graded puzzle.
+GRADE_BATCH = 8
+
+class LogicalSolver:
+    """Solves a 9x9 grid the way a person would, without guessing.
+
+    Each empty cell keeps a candidate bitmask that assignments and
+    eliminations update in place.  solve() applies TECHNIQUES in order,
+    restarting from the easiest after every step, and counts how often
+    each one was needed.
+    """
+
+    def __init__(self, cells):
+        self.cells = [0] * 81
+        self.cand = [ALL_DIGITS] * 81
+        self.remaining = 81
+        self.steps = collections.Counter()
+        for i, d in enumerate(cells):
+            if d:
+                self.assign(i, d)
+
+    def assign(self, i, d):
+        bit = 1 << d
+        cand = self.cand
+        self.cells[i] = d
+        cand[i] = 0
+        self.remaining -= 1
+        for p in PEERS[i]:
+            if cand[p] & bit:
+                cand[p] ^= bit
+
+    def eliminate(self, cells, mask):
+        cand = self.cand
+        removed = 0
+        for i in cells:
+            if cand[i] & mask:
+                cand[i] &= ~mask
+                removed += 1
+        return removed
+
+    def hidden_singles(self):
+        cand = self.cand
+        placed = 0
+        for unit in ALL_UNITS:
+            once = twice = 0
+            for i in unit:
+                m = cand[i]
+                twice |= once & m
+                once |= m
+            hidden = once & ~twice
+            while hidden:
+                bit = hidden & -hidden
+                hidden ^= bit
+                for i in unit:
+                    if cand[i] & bit:
+                        self.assign(i, BIT_DIGIT[bit])
+                        placed += 1
+                        break
+        return placed
+
+    def naked_singles(self):
+        cand = self.cand
+        placed = 0
+        for i in range(81):
+            if cand[i] and POPCOUNT[cand[i]] == 1:
+                self.assign(i, BIT_DIGIT[cand[i]])
+                placed += 1
+        return placed
+
+    def locked_candidates(self):
+        # Pointing: a digit confined to one line within a box leaves the
+        # rest of that line.  Claiming: a digit confined to one box within
+        # a line leaves the rest of that box.
+        cand = self.cand
+        removed = 0
+        for segment, line_rest, box_rest in BOX_LINE_INTERSECTIONS:
+            seg = cand[segment[0]] | cand[segment[1]] | cand[segment[2]]
+            if not seg:
+                continue
+            line_mask = box_mask = 0
+            for i in line_rest:
+                line_mask |= cand[i]
+            for i in box_rest:
+                box_mask |= cand[i]
+            pointing = seg & ~box_mask & line_mask
+            if pointing:
+                removed += self.eliminate(line_rest, pointing)
+            claiming = seg & ~line_mask & box_mask
+            if claiming:
+                removed += self.eliminate(box_rest, claiming)
+        return removed
+
+    def naked_subsets(self, k):
+        cand = self.cand
+        removed = 0
+        for unit in ALL_UNITS:
+            cells = [i for i in unit if 2 <= POPCOUNT[cand[i]] <= k]
+            for group in itertools.combinations(cells, k):
+                mask = 0
+                for i in group:
+                    mask |= cand[i]
+                if POPCOUNT[mask] == k:
+                    removed += self.eliminate([i for i in unit if i not in group], mask)
+        return removed
+
+    def hidden_subsets(self, k):
+        cand = self.cand
+        removed = 0
+        for unit in ALL_UNITS:
+            places = {}
+            for d in range(1, 10):
+                bit = 1 << d
+                where = [i for i in unit if cand[i] & bit]
+                if 2 <= len(where) <= k:
+                    places[bit] = where
+            for digits in itertools.combinations(places, k):
+                cells = set()
+                for bit in digits:
+                    cells.update(places[bit])
+                if len(cells) == k:
+                    keep = sum(digits)
+                    for i in cells:
+                        if cand[i] & ~keep:
+                            cand[i] &= keep
+                            removed += 1
+        return removed
+
+    def x_wings(self):
+        cand = self.cand
+        removed = 0
+        for bit in BIT_DIGIT:
+            for lines, cross in ((ROW_UNITS, COL_UNITS), (COL_UNITS, ROW_UNITS)):
+                pairs = {}
+                for k, line in enumerate(lines):
+                    where = tuple(n for n, i in enumerate(line) if cand[i] & bit)
+                    if len(where) == 2:
+                        pairs.setdefault(where, []).append(k)
+                for (a, b), found in pairs.items():
+                    if len(found) < 2:
+                        continue
+                    for first, second in itertools.combinations(found, 2):
+                        others = [i for n in (a, b) for i in cross[n] if i not in lines[first] and i not in lines[second]]
+                        removed += self.eliminate(others, bit)
+        return removed
+
+    def solve(self):
+        while self.remaining:
+            for name, rating, method, args in TECHNIQUES:
+                if getattr(self, method)(*args):
+                    self.steps[name] += 1
+                    break
+            else:
+                return False
+        return True
+
+    def score(self):
+        if self.remaining:
+            return GUESS_RATING
+        return max((rating for name, rating, method, args in TECHNIQUES if self.steps[name]), default=0.0)
+
+def grade_puzzle_cells(cells):
+    solver = LogicalSolver(cells)
+    solver.solve()
+    return solver.score(), dict(solver.steps)
+
+def grade_puzzle(board):
+    # (score, technique counts) for a 9x9 board; see TECHNIQUES.
+    return grade_puzzle_cells(board_cells(board))
+
+class BitmaskSolver:
+    """Backtracking solver over a flat 81-cell grid.
+
+    Row, column and box masks are updated on every assignment, naked and
+    hidden singles are filled before branching, and branching always picks
+    the empty cell with the fewest candidates.  Every assignment is pushed
+    on a trail so a failed branch is undone without copying the grid.
+    """
+
+    def __init__(self, cells):
+        self.cells = cells
+        self.rows = [0] * 9
+        self.cols = [0] * 9
+        self.boxes = [0] * 9
+        self.trail = []
+        self.empties = []
+        self.consistent = True
+        for i in range(81):
+            d = cells[i]
+            if not d:
+                self.empties.append(i)
+                continue
+            bit = 1 << d
+            r, c, b = CELL_ROW[i], CELL_COL[i], CELL_BOX[i]
+            if (self.rows[r] | self.cols[c] | self.boxes[b]) & bit:
+                self.consistent = False
+            self.rows[r] |= bit
+            self.cols[c] |= bit
+            self.boxes[b] |= bit
+
+    def candidates(self, i):
+        return ALL_DIGITS ^ (self.rows[CELL_ROW[i]] | self.cols[CELL_COL[i]] | self.boxes[CELL_BOX[i]])
+
+    def assign(self, i, d):
+        bit = 1 << d
+        self.cells[i] = d
+        self.rows[CELL_ROW[i]] |= bit
+        self.cols[CELL_COL[i]] |= bit
+        self.boxes[CELL_BOX[i]] |= bit
+        self.trail.append(i)
+
+    def undo(self, mark):
+        cells, rows, cols, boxes, trail = self.cells, self.rows, self.cols, self.boxes, self.trail
+        while len(trail) > mark:
+            i = trail.pop()
+            bit = 1 << cells[i]
+            cells[i] = 0
+            rows[CELL_ROW[i]] ^= bit
+            cols[CELL_COL[i]] ^= bit
+            boxes[CELL_BOX[i]] ^= bit
+
+    def propagate(self):
+        # Fill singles until none are left.  Returns (cell, candidates) for
+        # the best branching cell, (-1, 0) when the grid is full, or None on
+        # a contradiction.
+        cells, rows, cols, boxes = self.cells, self.rows, self.cols, self.boxes
+        while True:
+            best, best_cand, best_n = -1, 0, 10
+            changed = False
+            for i in self.empties:
+                if cells[i]:
+                    continue
+                cand = ALL_DIGITS ^ (rows[CELL_ROW[i]] | cols[CELL_COL[i]] | boxes[CELL_BOX[i]])
+                if not cand:
+                    return None
+                n = POPCOUNT[cand]
+                if n == 1:
+                    self.assign(i, BIT_DIGIT[cand])
+                    changed = True
+                elif n < best_n:
+                    best, best_cand, best_n = i, cand, n
+            if changed:
+                continue
+            if best < 0:
+                return -1, 0
+            found = self.hidden_singles()
+            if found is None:
+                return None
+            if not found:
+                return best, best_cand
+
+    def hidden_singles(self):
+        # Place every digit that has exactly one possible cell in some unit.
+        # Returns the number placed, or None if a digit has no cell left.
+        cells, rows, cols, boxes = self.cells, self.rows, self.cols, self.boxes
+        placed = 0
+        for masks, units in ((rows, ROW_UNITS), (cols, COL_UNITS), (boxes, BOX_UNITS)):
+            for k, unit in enumerate(units):
+                once = twice = 0
+                for i in unit:
+                    if not cells[i]:
+                        m = ALL_DIGITS ^ (rows[CELL_ROW[i]] | cols[CELL_COL[i]] | boxes[CELL_BOX[i]])
+                        twice |= once & m
+                        once |= m
+                if (once | masks[k]) != ALL_DIGITS:
+                    return None
+                hidden = once & ~twice
+                while hidden:
+                    bit = hidden & -hidden
+                    hidden ^= bit
+                    for i in unit:
+                        if not cells[i] and self.candidates(i) & bit:
+                            self.assign(i, BIT_DIGIT[bit])
+                            placed += 1
+                            break
+                    else:
+                        return None
+        return placed
+
+    def search(self, randomize=False):
+        mark = len(self.trail)
+        found = self.propagate()
+        if found is None:
+            self.undo(mark)
+            return False
+        i, cand = found
+        if i < 0:
+            return True
+        digits = MASK_DIGITS[cand]
+        if randomize:
+            digits = list(digits)
+            random.shuffle(digits)
+        for d in digits:
+            self.assign(i, d)
+            if self.search(randomize):
+                return True
+            self.undo(len(self.trail) - 1)
+        self.undo(mark)
+        return False
+
+    def solve(self, randomize=False):
+        return self.consistent and self.search(randomize)
+
+    def count(self, limit=2):
+        # Number of solutions, stopping once `limit` have been found.  The
+        # grid is left exactly as it was.
+        if not self.consistent:
+            return 0
+        return self._count(limit)
+
+    def _count(self, limit):
+        mark = len(self.trail)
+        found = self.propagate()
+        if found is None:
+            self.undo(mark)
+            return 0
+        i, cand = found
+        if i < 0:
+            self.undo(mark)
+            return 1
+        total = 0
+        for d in MASK_DIGITS[cand]:
+            self.assign(i, d)
+            total += self._count(limit - total)
+            self.undo(len(self.trail) - 1)
+            if total >= limit:
+                break
+        self.undo(mark)
+        return total
+
+    def remove_given(self, i):
+        bit = 1 << self.cells[i]
+        self.cells[i] = 0
+        self.rows[CELL_ROW[i]] ^= bit
+        self.cols[CELL_COL[i]] ^= bit
+        self.boxes[CELL_BOX[i]] ^= bit
+        self.empties.append(i)
+
+    def add_given(self, i, d):
+        bit = 1 << d
+        self.cells[i] = d
+        self.rows[CELL_ROW[i]] |= bit
+        self.cols[CELL_COL[i]] |= bit
+        self.boxes[CELL_BOX[i]] |= bit
+        self.empties.remove(i)
+
+    def forces(self, i, d):
+        # True when the givens leave no solution with a digit other than d
+        # at empty cell i.  If the grid had a unique solution before cell i
+        # was removed, this is exactly the test that it still does.
+        mark = len(self.trail)
+        for other in MASK_DIGITS[self.candidates(i) & ~(1 << d)]:
+            self.assign(i, other)
+            solved = self.search()
+            self.undo(mark)
+            if solved:
+                return False
+        return True
+
+DLX_TEMPLATES = {}
+
+def dlx_template(box):
+    # Links for the empty board's exact-cover matrix.  Columns 1..4*N*N are
+    # the cell, row-digit, column-digit and box-digit constraints (0 is the
+    # root); candidate k = cell * N + digit - 1 owns nodes first + 4k .. +3.
+    if box in DLX_TEMPLATES:
+        return DLX_TEMPLATES[box]
+    size = box * box
+    area = size * size
+    columns = 4 * area
+    first = columns + 1
+    left = list(range(-1, columns)) + [0] * (4 * area * size)
+    right = list(range(1, columns + 1)) + [0] + [0] * (4 * area * size)
+    left[0] = columns
+    up = list(range(first)) + [0] * (4 * area * size)
+    down = list(range(first)) + [0] * (4 * area * size)
+    column = list(range(first)) + [0] * (4 * area * size)
+    counts = [0] * first
+    node = first
+    for cell in range(area):
+        r, c = divmod(cell, size)
+        b = (r // box) * box + c // box
+        for d in range(size):
+            cols = (1 + cell, 1 + area + r * size + d, 1 + 2 * area + c * size + d, 1 + 3 * area + b * size + d)
+            for k, col in enumerate(cols):
+                n = node + k
+                column[n] = col
+                left[n] = node + (k - 1) % 4
+                right[n] = node + (k + 1) % 4
+                up[n] = up[col]
+                down[n] = col
+                down[up[col]] = n
+                up[col] = n
+                counts[col] += 1
+            node += 4
+    DLX_TEMPLATES[box] = left, right, up, down, column, counts
+    return DLX_TEMPLATES[box]
+
+class DancingLinksSolver:
+    """Knuth's Algorithm X on dancing links, for box sizes 3, 4 and 5.
+
+    The grid is a flat list of box**4 cells holding 0..box**2.  The links
+    for the empty board are built once per box size and copied, so a new
+    solver only pays for covering its givens.  Covers are undone in LIFO
+    order on the way out of the search, which leaves the links as they
+    were after the givens.
+    """
+
+    def __init__(self, cells, box=3):
+        self.cells = cells
+        self.box = box
+        self.size = box * box
+        left, right, up, down, column, counts = dlx_template(box)
+        self.left, self.right, self.up, self.down = left[:], right[:], up[:], down[:]
+        self.column = column
+        self.counts = counts[:]
+        self.first = 4 * self.size * self.size + 1
+        self.chosen = []
+        self.solution = None
+        self.nodes = 0
+        self.max_nodes = None
+        self.consistent = True
+        covered = set()
+        for i, d in enumerate(cells):
+            if not d:
+                continue
+            row = self.first + 4 * (i * self.size + d - 1)
+            cols = [column[row + k] for k in range(4)]
+            if covered.intersection(cols):
+                self.consistent = False
+                return
+            covered.update(cols)
+            for col in cols:
+                self.cover(col)
+
+    def cover(self, col):
+        left, right, up, down, column, counts = self.left, self.right, self.up, self.down, self.column, self.counts
+        left[right[col]] = left[col]
+        right[left[col]] = right[col]
+        i = down[col]
+        while i != col:
+            j = right[i]
+            while j != i:
+                up[down[j]] = up[j]
+                down[up[j]] = down[j]
+                counts[column[j]] -= 1
+                j = right[j]
+            i = down[i]
+
+    def uncover(self, col):
+        left, right, up, down, column, counts = self.left, self.right, self.up, self.down, self.column, self.counts
+        i = up[col]
+        while i != col:
+            j = left[i]
+            while j != i:
+                counts[column[j]] += 1
+                up[down[j]] = j
+                down[up[j]] = j
+                j = left[j]
+            i = up[i]
+        left[right[col]] = col
+        right[left[col]] = col
+
+    def choose_column(self):
+        right, counts = self.right, self.counts
+        best, best_count = 0, None
+        col = right[0]
+        while col:
+            n = counts[col]
+            if best_count is None or n < best_count:
+                best, best_count = col, n
+                if n < 2:
+                    break
+            col = right[col]
+        return best
+
+    def search(self, limit, randomize=False):
+        # Number of solutions found, up to `limit`; the rows of the last one
+        # are copied to self.solution.  The links are restored on return.
+        if not self.right[0]:
+            self.solution = self.chosen[:]
+            return 1
+        self.nodes += 1
+        if self.max_nodes is not None and self.nodes > self.max_nodes:
+            return 0
+        col = self.choose_column()
+        if not self.counts[col]:
+            return 0
+        rows = []
+        i = self.down[col]
+        while i != col:
+            rows.append(i)
+            i = self.down[i]
+        if randomize:
+            random.shuffle(rows)
+        right, left, column = self.right, self.left, self.column
+        total = 0
+        self.cover(col)
+        for row in rows:
+            self.chosen.append(row)
+            j = right[row]
+            while j != row:
+                self.cover(column[j])
+                j = right[j]
+            total += self.search(limit - total, randomize)
+            j = left[row]
+            while j != row:
+                self.uncover(column[j])
+                j = left[j]
+            self.chosen.pop()
+            if total >= limit:
+                break
+        self.uncover(col)
+        return total
+
+    def solve(self, randomize=False):
+        # Random fills of large empty boards have a heavy tail, so a
+        # randomized search that runs past its node budget starts over with
+        # a fresh shuffle and a doubled budget.
+        if not self.consistent:
+            return False
+        self.max_nodes = 4 * len(self.cells) if randomize else None
+        while True:
+            self.nodes = 0
+            if self.search(1, randomize):
+                break
+            if self.max_nodes is None or self.nodes <= self.max_nodes:
+                return False
+            self.max_nodes *= 2
+        for row in self.solution:
+            cell, d = divmod((row - self.first) // 4, self.size)
+            self.cells[cell] = d + 1
+        return True
+
+    def count(self, limit=2, max_nodes=None):
+        # Number of solutions, stopping once `limit` have been found.  A
+        # count that runs past `max_nodes` reports `limit`, so carving can
+        # treat a puzzle it could not prove unique in time as not unique.
+        if not self.consistent:
+            return 0
+        self.nodes = 0
+        self.max_nodes = max_nodes
+        found = self.search(limit)
+        if max_nodes is not None and self.nodes > max_nodes:
+            return limit
+        return found
+
+class SolverStats:
+    """Opt-in counters for the work behind one or more Sudoku puzzles.
+
+    Pass an instance as Sudoku(stats=...) and that Sudoku builds traced
+    solver subclasses that count into it.  Without one the plain solvers
+    run untouched.  `hook(event, cell, digit)` is called with 'assign' or
+    'undo' each time a solver fills or clears a cell.
+    """
+
+    PHASES = ('fill', 'removal', 'solve')
+
+    def __init__(self, hook=None):
+        self.hook = hook
+        self.reset()
+
+    def reset(self):
+        self.nodes = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.assignments = 0
+        self.times = dict.fromkeys(self.PHASES, 0.0)
+
+    @contextlib.contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.times[name] += time.perf_counter() - start
+
+    def as_dict(self):
+        return {
+            'nodes': self.nodes,
+            'backtracks': self.backtracks,
+            'max_depth': self.max_depth,
+            'assignments': self.assignments,
+            'times': dict(self.times),
+        }
+
+    def merge(self, data):
+        # Adds counts from as_dict(), e.g. returned by a worker process.
+        self.nodes += data['nodes']
+        self.backtracks += data['backtracks']
+        self.max_depth = max(self.max_depth, data['max_depth'])
+        self.assignments += data['assignments']
+        for name, seconds in data['times'].items():
+            self.times[name] += seconds
+
+    def summary(self):
+        times = ', '.join(f'{name} {self.times[name] * 1000:.1f} ms' for name in self.PHASES)
+        return (f'{self.nodes} nodes, {self.backtracks} backtracks, depth {self.max_depth}, '
+                f'{self.assignments} assignments; {times}')
+
+class TracedBitmaskSolver(BitmaskSolver):
+    # BitmaskSolver that counts its work into a SolverStats.  Depth is the
+    # number of nested search or count calls.
+    def __init__(self, cells, stats):
+        super().__init__(cells)
+        self.stats = stats
+        self.depth = 0
+
+    def assign(self, i, d):
+        super().assign(i, d)
+        self.stats.assignments += 1
+        if self.stats.hook is not None:
+            self.stats.hook('assign', i, d)
+
+    def undo(self, mark):
+        if self.stats.hook is not None:
+            for i in reversed(self.trail[mark:]):
+                self.stats.hook('undo', i, self.cells[i])
+        super().undo(mark)
+
+    def remove_given(self, i):
+        if self.stats.hook is not None:
+            self.stats.hook('undo', i, self.cells[i])
+        super().remove_given(i)
+
+    def add_given(self, i, d):
+        super().add_given(i, d)
+        if self.stats.hook is not None:
+            self.stats.hook('assign', i, d)
+
+    def search(self, randomize=False):
+        return self.traced(super().search, randomize)
+
+    def _count(self, limit):
+        return self.traced(super()._count, limit)
+
+    def traced(self, step, arg):
+        stats = self.stats
+        stats.nodes += 1
+        self.depth += 1
+        stats.max_depth = max(stats.max_depth, self.depth)
+        try:
+            result = step(arg)
+        finally:
+            self.depth -= 1
+        if not result:
+            stats.backtracks += 1
+        return result
+
+class TracedDancingLinksSolver(DancingLinksSolver):
+    # DancingLinksSolver that counts its work into a SolverStats.  Each
+    # nested search call below the root corresponds to one chosen row,
+    # which is reported to the hook as an assign and, on return, an undo.
+    def __init__(self, cells, box, stats):
+        super().__init__(cells, box)
+        self.stats = stats
+        self.depth = 0
+
+    def search(self, limit, randomize=False):
+        stats = self.stats
+        stats.nodes += 1
+        placed = None
+        if self.depth:
+            stats.assignments += 1
+            if stats.hook is not None:
+                cell, d = divmod((self.chosen[-1] - self.first) // 4, self.size)
+                placed = cell, d + 1
+                stats.hook('assign', *placed)
+        self.depth += 1
+        stats.max_depth = max(stats.max_depth, self.depth)
+        try:
+            result = super().search(limit, randomize)
+        finally:
+            self.depth -= 1
+        if not result:
+            stats.backtracks += 1
+        if placed is not None:
+            stats.hook('undo', *placed)
+        return result
+
+class Board:
+    """A square Sudoku grid in one bytearray, row by row, 0 for an empty cell.
+
+    board[r][c] reads and writes through a memoryview of row r, so code
+    written for nested lists keeps working; board[r, c] skips the view.
+    set() records the value it overwrites, so mark() and restore(mark)
+    roll the board back without copying it.  An empty 9x9 Board takes
+    about 200 bytes against 1.3 KB for nine lists.
+    """
+
+    __slots__ = ('size', 'cells', 'trail')
+
+    def __init__(self, cells=None, size=9):
+        self.size = size
+        self.cells = bytearray(size * size) if cells is None else bytearray(cells)
+        self.trail = None
+
+    @classmethod
+    def from_lists(cls, rows):
+        return cls([v for row in rows for v in row], len(rows))
+
+    @classmethod
+    def from_string(cls, text):
+        values = [CHAR_DIGITS.get(ch, 0) for ch in text.strip().upper()]
+        size = math.isqrt(len(values))
+        if size * size != len(values) or size not in (9, 16, 25):
+            raise ValueError(f'expected 81, 256 or 625 cells, got {len(values)}')
+        return cls(values, size)
+
+    def to_lists(self):
+        size = self.size
+        return [list(self.cells[i*size:(i + 1)*size]) for i in range(size)]
+
+    def to_string(self):
+        return self.cells.translate(DIGIT_BYTES).decode('ascii')
+
+    def copy(self):
+        return Board(self.cells, self.size)
+
+    def set(self, r, c, value):
+        i = r * self.size + c
+        if self.trail is None:
+            self.trail = []
+        self.trail.append((i, self.cells[i]))
+        self.cells[i] = value
+
+    def mark(self):
+        return len(self.trail) if self.trail else 0
+
+    def restore(self, mark=0):
+        cells, trail = self.cells, self.trail
+        while trail and len(trail) > mark:
+            i, value = trail.pop()
+            cells[i] = value
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            r, c = key
+            return self.cells[r * self.size + c]
+        return memoryview(self.cells)[key * self.size:(key + 1) * self.size]
+
+    def __setitem__(self, key, value):
+        r, c = key
+        self.cells[r * self.size + c] = value
+
+    def __len__(self):
+        return self.size
+
+    def __iter__(self):
+        return (self[r] for r in range(self.size))
+
+    def __eq__(self, other):
+        if not isinstance(other, Board):
+            return NotImplemented
+        return self.size == other.size and self.cells == other.cells
+
+    __hash__ = None
+
+    def __repr__(self):
+        return f'Board({self.to_string()!r})'
+
+def board_cells(board):
+    # Flat list of cell values from a Board or from nested lists.
+    if isinstance(board, Board):
+        return list(board.cells)
+    return [v for row in board for v in row]
+
+def as_board(board):
+    return board if board is None or isinstance(board, Board) else Board.from_lists(board)
 
 # Sudoku puzzle generator and solver
 class Sudoku:
-    def __init__(self, level='Easy'):
+    stats = None
+
+    def __init__(self, level='Easy', unique=True, time_budget=None, symmetric=False, bank=None, puzzle=None, box=3, graded=True, stats=None):
+        # `puzzle` is a ready (board, solution) pair.  Otherwise, with a
+        # PuzzleBank, a stored puzzle is used when the bank has one for this
+        # level, and the puzzle is generated live as a last resort.  `box`
+        # is the box width: 3 for 9x9, 4 for 16x16, 5 for 25x25 boards.
+        # `stats` is an optional SolverStats that all solver work counts into.
         self.level = level
-        self.board = self.generate_puzzle(level)
-        self.solution = copy.deepcopy(self.board)
-        self.solve(self.solution)
+        self.box = box
+        self.size = box * box
+        self.stats = stats
+        stored = puzzle
+        if stored is None and bank is not None and box == 3:
+            stored = bank.random_puzzle(level)
+        if stored:
+            self.board, self.solution = as_board(stored[0]), as_board(stored[1])
+        else:
+            self.board, self.solution = self.generate(level, unique, time_budget, symmetric, graded)
+
+    def new_solver(self, cells):
+        # The traced subclasses are only used while stats are being kept.
+        box = math.isqrt(math.isqrt(len(cells)))
+        if box == 3:
+            return BitmaskSolver(cells) if self.stats is None else TracedBitmaskSolver(cells, self.stats)
+        if self.stats is None:
+            return DancingLinksSolver(cells, box)
+        return TracedDancingLinksSolver(cells, box, self.stats)
+
+    def phase(self, name):
+        return contextlib.nullcontext() if self.stats is None else self.stats.phase(name)
 
     def generate_full_board(self):
-        board = [[0]*9 for _ in range(9)]
+        board = Board(size=self.size)
         self.solve(board, randomize=True)
         return board
 
-    def generate_puzzle(self, level):
-        board = self.generate_full_board()
-        if level == 'Easy':
-            removals = 35
-        elif level == 'Medium':
-            removals = 45
+    def generate(self, level, unique=True, time_budget=None, symmetric=False, graded=False):
+        # Returns (puzzle, solution); the solution is the full board the
+        # puzzle was carved from, so it never has to be solved again.  With
+        # `graded`, 9x9 levels are picked by technique score (LEVEL_SCORES)
+        # rather than by the number of holes.
+        if unique and graded and self.box == 3:
+            return self.generate_graded_puzzle(level, time_budget, symmetric)
+        if self.box == 3:
+            removals = LEVEL_REMOVALS.get(level, 55)
         else:
-            removals = 55
-        positions = [(i, j) for i in range(9) for j in range(9)]
+            shares = LARGE_LEVEL_HOLES.get(self.box, LARGE_LEVEL_HOLES[5])
+            removals = int(shares.get(level, shares['Challenging']) * self.size ** 2)
+        if unique:
+            return self.generate_unique_puzzle(removals, time_budget, symmetric)
+        board = self.generate_full_board()
+        puzzle = board.copy()
+        positions = [(i, j) for i in range(self.size) for j in range(self.size)]
         random.shuffle(positions)
         for _ in range(removals):
-            i, j = positions.pop()
-            board[i][j] = 0
-        return board
+            puzzle[positions.pop()] = 0
+        return puzzle, board
+
+    def generate_puzzle(self, level, unique=False, time_budget=None, symmetric=False):
+        return self.generate(level, unique, time_budget, symmetric)[0]
+
+    def generate_unique_puzzle(self, removals, time_budget=None, symmetric=False, attempts=3):
+        # Some full boards cannot lose `removals` cells and stay unique, so
+        # retry on fresh boards and keep the puzzle with the most holes.
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        best, best_holes = None, -1
+        for _ in range(attempts):
+            board = self.generate_full_board()
+            with self.phase('removal'):
+                if self.box == 3:
+                    puzzle = self.carve_unique(board, removals, deadline, symmetric)
+                else:
+                    puzzle = self.carve_unique_batched(board, removals, deadline, symmetric)
+            holes = puzzle.cells.count(0)
+            if holes > best_holes:
+                best, best_holes = (puzzle, board), holes
+            if holes >= removals or (deadline is not None and time.perf_counter() > deadline):
+                break
+        return best
+
+    def generate_graded_puzzle(self, level, time_budget=None, symmetric=False, attempts=30):
+        # Carve up to the level's holes without letting the score pass its
+        # ceiling, then keep the puzzle if it reached the floor.  Otherwise
+        # retry on a fresh board and fall back to the hardest puzzle seen.
+        low, high = LEVEL_SCORES.get(level, LEVEL_SCORES['Challenging'])
+        removals = LEVEL_HOLES.get(level, LEVEL_HOLES['Challenging'])
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        best, best_score = None, -1.0
+        for _ in range(attempts):
+            board = self.generate_full_board()
+            with self.phase('removal'):
+                puzzle = self.carve_unique(board, removals, deadline, symmetric, max_score=high)
+                score = grade_puzzle(puzzle)[0]
+            if score > best_score:
+                best, best_score = (puzzle, board), score
+            if score >= low or (deadline is not None and time.perf_counter() > deadline):
+                break
+        return best
+
+    def carve_unique(self, board, removals, deadline=None, symmetric=False, max_score=None):
+        # Remove givens one at a time (or in 180-degree symmetric pairs) and
+        # keep a removal only while the puzzle still has a single solution
+        # and, with `max_score`, still grades no harder than that.  Grading
+        # costs far more than the uniqueness test, so removals are graded
+        # GRADE_BATCH at a time and only a batch that grades too hard is
+        # replayed one removal at a time.  Stops at `removals` holes, when
+        # no cell can go, or at `deadline` (a time.perf_counter() value).
+        solver = self.new_solver(board_cells(board))
+        positions = list(range(41 if symmetric else 81))
+        random.shuffle(positions)
+        holes = 0
+        ungraded = []
+        for i in positions:
+            if holes >= removals or (deadline is not None and time.perf_counter() > deadline):
+                break
+            group = (i, 80 - i) if symmetric and i != 40 else (i,)
+            if holes + len(group) > removals:
+                continue
+            digits = [solver.cells[j] for j in group]
+            for j in group:
+                solver.remove_given(j)
+            if all(solver.forces(j, d) for j, d in zip(group, digits)):
+                holes += len(group)
+                if max_score is not None:
+                    ungraded.append((group, digits))
+                    if len(ungraded) >= GRADE_BATCH or holes >= removals:
+                        holes -= self.grade_removals(solver, ungraded, max_score)
+                        ungraded = []
+            else:
+                for j, d in zip(group, digits):
+                    solver.add_given(j, d)
+        if ungraded:
+            holes -= self.grade_removals(solver, ungraded, max_score)
+        return Board(solver.cells)
+
+    def grade_removals(self, solver, removed, max_score):
+        # Puts back the removals, in carve order, that take the score past
+        # `max_score`; returns the number of cells restored.  Every removal
+        # was unique when made, and restoring givens keeps it so.
+        if grade_puzzle_cells(solver.cells)[0] <= max_score:
+            return 0
+        for group, digits in reversed(removed):
+            for j, d in zip(group, digits):
+                solver.add_given(j, d)
+        restored = 0
+        for group, digits in removed:
+            for j in group:
+                solver.remove_given(j)
+            if grade_puzzle_cells(solver.cells)[0] > max_score:
+                for j, d in zip(group, digits):
+                    solver.add_given(j, d)
+                restored += len(group)
+        return restored
+
+    def carve_unique_batched(self, board, removals, deadline=None, symmetric=False):
+        # carve_unique for the dancing-links boards, which cannot drop a
+        # single given cheaply.  Removals are tried in batches that double
+        # while the puzzle stays unique and halve when it does not, so most
+        # cells are cleared without a solution count of their own.
+        area = self.size * self.size
+        cells = board_cells(board)
+        groups = [(i, area - 1 - i) if symmetric and i != area - 1 - i else (i,) for i in range((area + 1) // 2 if symmetric else area)]
+        random.shuffle(groups)
+        holes = 0
+        batch = 8
+        pos = 0
+        while pos < len(groups) and holes < removals:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            taken = []
+            for group in groups[pos:pos + batch]:
+                if holes + len(taken) + len(group) > removals:
+                    break
+                taken.extend(group)
+            if not taken:
+                pos += 1
+                continue
+            digits = [cells[i] for i in taken]
+            for i in taken:
+                cells[i] = 0
+            groups_taken = min(batch, len(groups) - pos)
+            if self.new_solver(cells).count(2, max_nodes=COUNT_NODE_BUDGET) == 1:
+                holes += len(taken)
+                pos += groups_taken
+                batch *= 2
+            else:
+                for i, d in zip(taken, digits):
+                    cells[i] = d
+                if batch == 1:
+                    pos += 1
+                batch = max(1, batch // 2)
+        return Board(cells, self.size)
+
+    def count_solutions(self, board, limit=2):
+        return self.new_solver(board_cells(board)).count(limit)
 
     def find_empty(self, board):
-        for i in range(9):
-            for j in range(9):
-                if board[i][j] == 0:
+        for i, row in enumerate(board):
+            for j, val in enumerate(row):
+                if val == 0:
                     return i, j
         return None
 
     def valid(self, board, num, pos):
         row, col = pos
-        for i in range(9):
+        size = len(board)
+        box = math.isqrt(size)
+        for i in range(size):
             if board[row][i] == num and i != col:
                 return False
-        for i in range(9):
+        for i in range(size):
             if board[i][col] == num and i != row:
                 return False
-        box_x = col // 3
-        box_y = row // 3
-        for i in range(box_y*3, box_y*3 + 3):
-            for j in range(box_x*3, box_x*3 + 3):
+        box_x = col // box
+        box_y = row // box
+        for i in range(box_y*box, box_y*box + box):
+            for j in range(box_x*box, box_x*box + box):
                 if board[i][j] == num and (i, j) != pos:
                     return False
         return True
 
     def solve(self, board, randomize=False):
-        empty = self.find_empty(board)
-        if not empty:
-            return True
-        row, col = empty
-        nums = list(range(1, 10))
-        if randomize:
-            random.shuffle(nums)
-        for num in nums:
-            if self.valid(board, num, (row, col)):
-                board[row][col] = num
-                if self.solve(board, randomize):
-                    return True
-                board[row][col] = 0
-        return False
+        # 9x9 boards use the bitmask engine; 16x16 and 25x25 use dancing links.
+        # A randomized solve fills a new board, so it is timed as 'fill'.
+        size = len(board)
+        solver = self.new_solver(board_cells(board))
+        with self.phase('fill' if randomize else 'solve'):
+            if not solver.solve(randomize):
+                return False
+        if isinstance(board, Board):
+            board.cells[:] = bytes(solver.cells)
+        else:
+            # bytes() suits both list rows and Board row views.
+            for i in range(size):
+                board[i][:] = bytes(solver.cells[i*size:(i + 1)*size])
+        return True
+
+# Digits above 9 (16x16 and 25x25 boards) are written as letters A-P.
+DIGIT_CHARS = '.123456789ABCDEFGHIJKLMNOP'
+CHAR_DIGITS = {ch: d for d, ch in enumerate(DIGIT_CHARS)}
+CHAR_DIGITS['0'] = 0
+DIGIT_BYTES = DIGIT_CHARS.encode().ljust(256, b'?')
+
+def board_to_string(board):
+    if isinstance(board, Board):
+        return board.to_string()
+    return ''.join(DIGIT_CHARS[v] for row in board for v in row)
+
+def board_from_string(text):
+    return Board.from_string(text)
+
+# Batch grading.  Boards are (N, 9, 9) uint8 arrays with 0 for an empty
+# cell, and every check is a whole-array NumPy operation.
+GRADE_CHUNK = 65536
+
+def boards_to_array(texts):
+    # 81-char strings (as written by board_to_string) to an (N, 9, 9) array.
+    if not load_numpy():
+        raise ImportError('boards_to_array needs NumPy')
+    raw = np.frombuffer(''.join(texts).encode('ascii'), dtype=np.uint8).reshape(-1, 9, 9) - ord('0')
+    raw[raw > 9] = 0
+    return raw
+
+def board_array(boards):
+    # A Board, or anything np.asarray takes, as an (N, 9, 9) uint8 array.
+    if isinstance(boards, Board):
+        return np.frombuffer(boards.cells, dtype=np.uint8).reshape(1, 9, 9)
+    return np.asarray(boards, dtype=np.uint8).reshape(-1, 9, 9)
+
+def grade_boards(boards, solutions=None):
+    """Check a batch of boards at once.
+
+    Returns a dict of arrays: 'valid' (N,) no digit repeats in a row,
+    column or box; 'complete' (N,) no empty cells; 'conflicts' (N, 9, 9)
+    cells whose digit is repeated in one of its units; and, when
+    `solutions` is given, 'correct' (N, 9, 9) cells equal to the solution
+    and 'matches' (N,) boards equal to their solution.
+    """
+    if not load_numpy():
+        raise ImportError('grade_boards needs NumPy')
+    boards = board_array(boards)
+    n = len(boards)
+    conflicts = np.empty((n, 9, 9), dtype=bool)
+    digits = np.arange(1, 10, dtype=np.uint8)
+    rows = np.arange(9)[:, None] // 3
+    cols = np.arange(9)[None, :] // 3
+    # Temporaries are (chunk, 9, 9, 9), so work through large batches in
+    # slices to keep memory flat.
+    for start in range(0, n, GRADE_CHUNK):
+        chunk = boards[start:start + GRADE_CHUNK]
+        onehot = (chunk[..., None] == digits).view(np.uint8)
+        row_dup = onehot.sum(axis=2, dtype=np.uint8) > 1
+        col_dup = onehot.sum(axis=1, dtype=np.uint8) > 1
+        box_dup = onehot.reshape(-1, 3, 3, 3, 3, 9).sum(axis=(2, 4), dtype=np.uint8) > 1
+        index = chunk.astype(np.intp) - 1
+        index[index < 0] = 0
+        dup = np.take_along_axis(row_dup, index, axis=2)
+        dup |= np.take_along_axis(col_dup, index.transpose(0, 2, 1), axis=2).transpose(0, 2, 1)
+        dup |= box_dup[np.arange(len(chunk))[:, None, None], rows, cols, index]
+        conflicts[start:start + GRADE_CHUNK] = dup & (chunk != 0)
+    result = {
+        'valid': ~conflicts.any(axis=(1, 2)),
+        'complete': (boards != 0).all(axis=(1, 2)),
+        'conflicts': conflicts,
+    }
+    if solutions is not None:
+        solutions = board_array(solutions)
+        result['correct'] = boards == solutions
+        result['matches'] = result['correct'].all(axis=(1, 2))
+    return result
+
+# Canonical forms.  Relabeling digits, permuting rows within a band or
+# columns within a stack, permuting bands or stacks and transposing all
+# turn a puzzle into an equivalent one.  canonical_form() picks one
+# representative per class, so equivalent puzzles hash alike.
+CANONICAL_TIES = 64
+DEDUP_BATCH = 10000
+FIRST_ROW_ORDERS = {}
+FIRST_ROW_REFINEMENTS = {}
+
+def first_row_orders(row, box):
+    # Every column order that makes `row` the smallest possible first row:
+    # stacks with more givens first, givens before blanks within a stack.
+    # Stacks with equal counts, and the givens or blanks within a stack,
+    # can go in any order, so all of those orders are returned.  They only
+    # depend on which cells are given, which is what they are cached by.
+    row = tuple(bool(v) for v in row)
+    if (box, row) in FIRST_ROW_ORDERS:
+        return FIRST_ROW_ORDERS[box, row]
+    stacks = [list(range(s, s + box)) for s in range(0, box * box, box)]
+    stacks.sort(key=lambda cols: -sum(1 for c in cols if row[c]))
+    choices = []
+    for _, group in itertools.groupby(stacks, key=lambda cols: sum(1 for c in cols if row[c])):
+        group = list(group)
+        inner = [list(itertools.product(itertools.permutations([c for c in cols if row[c]]),
+                                        itertools.permutations([c for c in cols if not row[c]])))
+                 for cols in group]
+        choices.append([(order, picks) for order in itertools.permutations(range(len(group)))
+                        for picks in itertools.product(*inner)])
+    orders = []
+    for combo in itertools.product(*choices):
+        cols = []
+        for order, picks in combo:
+            for k in order:
+                givens, blanks = picks[k]
+                cols += givens + blanks
+        orders.append(tuple(cols))
+    FIRST_ROW_ORDERS[box, row] = orders
+    return orders
+
+def canonical_by_digits(grids, size, box):
+    # Digit-aware search for boards whose given cells are too symmetric for
+    # canonical_by_pattern, such as complete grids.  Row by row, every
+    # partial board that ties for the smallest prefix is carried forward.
+    blank = size + 1
+    # A partial board is (grid, source rows used, column order, labels by
+    # digit, next free label).
+    best = max(tuple(sorted((sum(1 for v in row[s:s + box] if v) for s in range(0, size, box)), reverse=True))
+               for grid in grids for row in grid)
+    states = []
+    for grid in grids:
+        for r, row in enumerate(grid):
+            counts = tuple(sorted((sum(1 for v in row[s:s + box] if v) for s in range(0, size, box)), reverse=True))
+            if counts == best:
+                for cols in first_row_orders(row, box):
+                    labels = [blank] + [0] * size
+                    fresh = 1
+                    for c in cols:
+                        if row[c]:
+                            labels[row[c]] = fresh
+                            fresh += 1
+                    states.append((grid, (r,), cols, labels, fresh))
+    first = sum(best)
+    form = list(range(1, first + 1)) + [blank] * (size - first)
+    for k in range(1, size):
+        best_row = None
+        kept = []
+        for grid, used, cols, labels, fresh in states:
+            if k % box:
+                band = used[-1] // box * box
+                sources = [r for r in range(band, band + box) if r not in used]
+            else:
+                bands = {r // box for r in used}
+                sources = [r for r in range(size) if r // box not in bands]
+            for r in sources:
+                row = grid[r]
+                key = [labels[row[c]] for c in cols]
+                after, next_fresh = labels, fresh
+                if 0 in key:
+                    # Digits seen for the first time get the next labels.
+                    after = labels[:]
+                    for n, c in enumerate(cols):
+                        if not key[n]:
+                            v = row[c]
+                            if not after[v]:
+                                after[v] = next_fresh
+                                next_fresh += 1
+                            key[n] = after[v]
+                if best_row is None or key < best_row:
+                    best_row = key
+                    kept = []
+                if key == best_row:
+                    kept.append((grid, used + (r,), cols, after, next_fresh))
+        form += best_row
+        states = kept
+    return form
+
+def split_stack(stack, row):
+    # Splits each block of a stack into its given then its blank columns.
+    pattern = []
+    blocks = []
+    for block in stack:
+        if len(block) == 1:
+            blocks.append(block)
+            pattern.append(0 if row[block[0]] else 1)
+            continue
+        givens = [c for c in block if row[c]]
+        blanks = [c for c in block if not row[c]]
+        if givens:
+            blocks.append(givens)
+        if blanks:
+            blocks.append(blanks)
+        pattern += [0] * len(givens) + [1] * len(blanks)
+    return pattern, blocks
+
+def refine_columns(groups, row):
+    # Orders the columns of each block given cells first, then orders
+    # interchangeable stacks by the result.  Returns the row's pattern
+    # (0 for a given, 1 for a blank) and the refined groups.
+    key = []
+    refined = []
+    for group in groups:
+        if len(group) == 1:
+            pattern, blocks = split_stack(group[0], row)
+            key += pattern
+            refined.append([blocks])
+            continue
+        stacks = sorted((split_stack(stack, row) for stack in group), key=lambda stack: stack[0])
+        for pattern, same in itertools.groupby(stacks, key=lambda stack: stack[0]):
+            same = [blocks for _, blocks in same]
+            key += pattern * len(same)
+            refined.append(same)
+    return key, refined
+
+def first_row_refinement(row, box):
+    # refine_columns from the starting partition, cached by which cells of
+    # the row are given.
+    row = tuple(bool(v) for v in row)
+    if (box, row) not in FIRST_ROW_REFINEMENTS:
+        FIRST_ROW_REFINEMENTS[box, row] = refine_columns([[[list(range(s, s + box))] for s in range(0, box * box, box)]], row)
+    return FIRST_ROW_REFINEMENTS[box, row]
+
+def column_orders(groups, grid):
+    # Every column order a refined partition allows.  Columns that are
+    # blank in every row can stay in one order.
+    def blank(cols):
+        return not any(row[c] for row in grid for c in cols)
+    choices = []
+    for group in groups:
+        inner = [list(itertools.product(*[[block] if blank(block) else itertools.permutations(block) for block in stack]))
+                 for stack in group]
+        if blank([c for block in group[0] for c in block]):
+            orders = [range(len(group))]
+        else:
+            orders = itertools.permutations(range(len(group)))
+        choices.append([[c for k in order for block in picks[k] for c in block]
+                        for order in orders for picks in itertools.product(*inner)])
+    return [tuple(c for part in combo for c in part) for combo in itertools.product(*choices)]
+
+def canonical_by_pattern(grids, size, box, limit=CANONICAL_TIES):
+    # Fixes the pattern of given cells first, one row at a time.  Columns
+    # that no row has told apart yet stay together in a block, so ties cost
+    # nothing until the digits are compared at the end.  Returns None when
+    # more than `limit` arrangements tie.
+    blank = size + 1
+    states = [(grid, (), None) for grid in grids]
+    for k in range(size):
+        best = None
+        kept = []
+        for grid, used, groups in states:
+            if k % box:
+                band = used[-1] // box * box
+                sources = [r for r in range(band, band + box) if r not in used]
+            else:
+                bands = {r // box for r in used}
+                sources = [r for r in range(size) if r // box not in bands]
+            blank_bands = set()
+            for r in sources:
+                # Blank rows of one band are interchangeable; try one.
+                if not any(grid[r]):
+                    if r // box in blank_bands:
+                        continue
+                    blank_bands.add(r // box)
+                if k:
+                    key, refined = refine_columns(groups, grid[r])
+                else:
+                    key, refined = first_row_refinement(grid[r], box)
+                if best is None or key < best:
+                    best = key
+                    kept = []
+                if key == best:
+                    kept.append((grid, used + (r,), refined))
+        if len(kept) > limit:
+            return None
+        states = kept
+    arrangements = [(grid, used, column_orders(groups, grid)) for grid, used, groups in states]
+    if sum(len(orders) for _, _, orders in arrangements) > limit:
+        return None
+    form = None
+    for grid, used, orders in arrangements:
+        for cols in orders:
+            labels = [blank] + [0] * size
+            fresh = 1
+            candidate = []
+            for r in used:
+                row = grid[r]
+                for c in cols:
+                    v = row[c]
+                    if not labels[v]:
+                        labels[v] = fresh
+                        fresh += 1
+                    candidate.append(labels[v])
+            if form is None or candidate < form:
+                form = candidate
+    return form
+
+def canonical_form(board):
+    """The canonical representative of `board`'s equivalence class, as a string.
+
+    Equivalent boards are compared by the pattern of their given cells
+    first (givens as early as possible), then by their digits renumbered
+    in order of appearance, and the smallest one is returned.  Patterns
+    that tie in too many ways, as a complete grid's do, are compared on
+    the renumbered digits alone.  A puzzle takes a fraction of a
+    millisecond; a complete grid about 0.1 s.
+    """
+    cells = board_cells(board_from_string(board) if isinstance(board, str) else board)
+    size = math.isqrt(len(cells))
+    box = math.isqrt(size)
+    rows = [cells[r * size:(r + 1) * size] for r in range(size)]
+    grids = (rows, [list(col) for col in zip(*rows)])
+    form = canonical_by_pattern(grids, size, box) or canonical_by_digits(grids, size, box)
+    return ''.join(DIGIT_CHARS[0 if v > size else v] for v in form)
+
+def canonical_hash(board):
+    # 64-bit hash of the canonical form, stable across runs and machines.
+    return int.from_bytes(hashlib.blake2b(canonical_form(board).encode(), digest_size=8).digest(), 'little')
+
+class PuzzleDeduplicator:
+    """Filters a stream of puzzles down to one per equivalence class.
+
+    A Bloom filter sized for `capacity` puzzles answers most lookups in
+    memory.  With `path`, the canonical hashes are also kept in an SQLite
+    table there, and only the filter's hits are looked up on disk, so no
+    new puzzle is ever dropped and memory stays fixed however long the
+    stream.  Without a path the filter decides alone, and about
+    `error_rate` of the new puzzles are dropped as false positives.
+    """
+
+    def __init__(self, capacity=1000000, error_rate=0.001, path=None):
+        self.bits = max(64, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.bits / capacity * math.log(2)))
+        self.filter = bytearray((self.bits + 7) // 8)
+        self.seen = self.duplicates = self.disk_lookups = 0
+        self.db = None
+        self.pending = 0
+        if path:
+            import sqlite3
+            self.db = sqlite3.connect(path)
+            self.db.execute('CREATE TABLE IF NOT EXISTS canonical (hash INTEGER PRIMARY KEY)')
+            # Hashes stored by an earlier run go into the filter too.
+            for (h,) in self.db.execute('SELECT hash FROM canonical'):
+                self.mark(h + (1 << 63))
+
+    def positions(self, h):
+        # Double hashing: k probes from the two halves of the 64-bit hash.
+        step = h >> 32 | 1
+        return [(h + k * step) % self.bits for k in range(self.hashes)]
+
+    def mark(self, h):
+        maybe = True
+        for p in self.positions(h):
+            byte, bit = p >> 3, 1 << (p & 7)
+            if not self.filter[byte] & bit:
+                maybe = False
+                self.filter[byte] |= bit
+        return maybe
+
+    def add(self, board):
+        # True if no equivalent puzzle was added before.
+        h = canonical_hash(board)
+        self.seen += 1
+        if self.mark(h):
+            if self.db is None:
+                self.duplicates += 1
+                return False
+            self.disk_lookups += 1
+            if self.db.execute('SELECT 1 FROM canonical WHERE hash = ?', (h - (1 << 63),)).fetchone():
+                self.duplicates += 1
+                return False
+        if self.db is not None:
+            self.db.execute('INSERT INTO canonical VALUES (?)', (h - (1 << 63),))
+            self.pending += 1
+            if self.pending >= DEDUP_BATCH:
+                self.db.commit()
+                self.pending = 0
+        return True
+
+    def summary(self):
+        return f'{self.seen} seen, {self.duplicates} duplicates, {self.disk_lookups} disk lookups'
+
+    def close(self):
+        if self.db is not None:
+            self.db.commit()
+            self.db.close()
+            self.db = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+# Headless bulk generation: `python sudoku.py generate ...`
+def generate_chunk(task):
+    # Runs in a worker process.  Each chunk reseeds from (seed, level, index)
+    # so the output only depends on the seed, never on scheduling or --jobs.
+    # With `traced`, the chunk's SolverStats come back as a dict.
+    index, level, count, seed, symmetric, traced = task
+    random.seed(None if seed is None else f'{seed}:{level}:{index}')
+    stats = SolverStats() if traced else None
+    pairs = []
+    for _ in range(count):
+        sudoku = Sudoku(level, symmetric=symmetric, stats=stats)
+        pairs.append((board_to_string(sudoku.board), board_to_string(sudoku.solution)))
+    return index, pairs, stats and stats.as_dict()
+
+def generate_stream(level, count, jobs=0, seed=None, chunk_size=256, symmetric=False, unordered=False, stats=None):
+    # Yields lists of (puzzle, solution) strings, one list per chunk.  At most
+    # two chunks per worker are in flight, so memory stays bounded no matter
+    # how large `count` is.  Progress goes to stderr.  Workers' solver stats
+    # are merged into `stats` when one is given.
+    jobs = jobs or os.cpu_count() or 1
+    tasks = ((i, level, min(chunk_size, count - i * chunk_size), seed, symmetric, stats is not None)
+             for i in range((count + chunk_size - 1) // chunk_size))
+    pending = {}
+    done = 0
+    start = last_report = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=jobs) as pool:
+        def submit_next():
+            task = next(tasks, None)
+            if task is not None:
+                pending[task[0]] = pool.submit(generate_chunk, task)
+        for _ in range(jobs * 2):
+            submit_next()
+        next_index = 0
+        try:
+            while pending:
+                if unordered:
+                    finished, _ = concurrent.futures.wait(pending.values(), return_when=concurrent.futures.FIRST_COMPLETED)
+                    future = finished.pop()
+                else:
+                    future = pending[next_index]
+                    next_index += 1
+                index, pairs, counts = future.result()
+                if counts:
+                    stats.merge(counts)
+                del pending[index]
+                submit_next()
+                done += len(pairs)
+                now = time.perf_counter()
+                if now - last_report >= 1.0:
+                    last_report = now
+                    print(f'{level}: {done}/{count} puzzles, {done / (now - start):.0f} puzzles/sec', file=sys.stderr)
+                yield pairs
+        finally:
+            for future in pending.values():
+                future.cancel()
+    elapsed = time.perf_counter() - start
+    print(f'{done} {level} puzzles in {elapsed:.2f}s, {done / elapsed:.0f} puzzles/sec with {jobs} jobs', file=sys.stderr)
+
+def open_deduplicator(args):
+    if not args.dedup and not args.dedup_db:
+        return None
+    return PuzzleDeduplicator(args.dedup_capacity, path=args.dedup_db)
+
+def run_generate(args):
+    out = open(args.output, 'w') if args.output else sys.stdout
+    stats = SolverStats() if args.stats else None
+    dedup = open_deduplicator(args)
+    if args.transform:
+        stream = transform_stream(args.level, args.count, args.pool, args.jobs, args.seed)
+    else:
+        stream = generate_stream(args.level, args.count, args.jobs, args.seed, args.chunk_size, args.symmetric, args.unordered, stats)
+    try:
+        for pairs in stream:
+            if dedup:
+                pairs = [pair for pair in pairs if dedup.add(pair[0])]
+                if not pairs:
+                    continue
+            if args.format == 'ndjson':
+                lines = [json.dumps({'level': args.level, 'puzzle': p, 'solution': sol}) for p, sol in pairs]
+            else:
+                lines = [p for p, sol in pairs]
+            out.write('\n'.join(lines) + '\n')
+        out.flush()
+    except (BrokenPipeError, KeyboardInterrupt):
+        stream.close()
+        return 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+        if dedup:
+            dedup.close()
+    if stats:
+        print(f'solver: {stats.summary()}', file=sys.stderr)
+    if dedup:
+        print(f'dedup: {dedup.summary()}', file=sys.stderr)
+    return 0
+
+# Transformation-based generation.  Relabeling digits, permuting rows
+# within bands and columns within stacks, permuting bands and stacks and
+# transposing keep a puzzle valid, unique and equally hard (rotations and
+# reflections are among these).  SeedPool keeps verified puzzles from the
+# normal generator and derives new ones from them this way.
+TRANSFORM_ORDERS = 1296
+TRANSFORM_DIGIT_TABLES = 4096
+TRANSFORM_BATCH = 256
+TRANSFORM_TABLES = {}
+
+def transform_tables(box):
+    # Cell getters for row orders and for column orders (plain and followed
+    # by a transposition), and digit relabeling tables for bytes.translate.
+    # Getters work on a puzzle and its solution joined end to end, so both
+    # move in one call.  A 9x9 board has exactly 1296 row orders; larger
+    # boards get a fixed random sample of as many.
+    if box in TRANSFORM_TABLES:
+        return TRANSFORM_TABLES[box]
+    size = box * box
+    area = size * size
+    rng = random.Random(box)
+    if math.factorial(box) ** (box + 1) <= TRANSFORM_ORDERS:
+        orders = [[bands[k] * box + rows[k][i] for k in range(box) for i in range(box)]
+                  for bands in itertools.permutations(range(box))
+                  for rows in itertools.product(itertools.permutations(range(box)), repeat=box)]
+    else:
+        orders = [[b * box + i for b in rng.sample(range(box), box) for i in rng.sample(range(box), box)]
+                  for _ in range(TRANSFORM_ORDERS)]
+    def getter(cells):
+        return operator.itemgetter(*cells, *[area + i for i in cells])
+    row_getters = [getter([r * size + c for r in order for c in range(size)]) for order in orders]
+    col_getters = [getter([r * size + c for r in range(size) for c in order]) for order in orders]
+    col_t_getters = [getter([order[c] * size + r for r in range(size) for c in range(size)]) for order in orders]
+    identity = bytes(range(256))
+    digit_tables = [bytes([0] + rng.sample(range(1, size + 1), size)) + identity[size + 1:]
+                    for _ in range(TRANSFORM_DIGIT_TABLES)]
+    TRANSFORM_TABLES[box] = row_getters, col_getters + col_t_getters, digit_tables
+    return TRANSFORM_TABLES[box]
+
+def transform_cells(cells, rng=random):
+    # One random transformation of a puzzle and its solution joined end to
+    # end as bytes of cell values, returned the same way.
+    box = math.isqrt(math.isqrt(len(cells) // 2))
+    row_getters, col_getters, digit_tables = transform_tables(box)
+    pick = rng.getrandbits(64)
+    rows = row_getters[pick % len(row_getters)]
+    pick //= len(row_getters)
+    cols = col_getters[pick % len(col_getters)]
+    pick //= len(col_getters)
+    return bytes(cols(rows(cells))).translate(digit_tables[pick % len(digit_tables)])
+
+def transform_arrays(box):
+    # transform_tables as NumPy index arrays, for transform_batch.
+    if ('arrays', box) not in TRANSFORM_TABLES:
+        row_getters, col_getters, digit_tables = transform_tables(box)
+        cells = np.arange(2 * box ** 4)
+        TRANSFORM_TABLES['arrays', box] = (np.array([g(cells) for g in row_getters], dtype=np.intp),
+                                           np.array([g(cells) for g in col_getters], dtype=np.intp),
+                                           np.frombuffer(b''.join(t[:box * box + 1] for t in digit_tables), dtype=np.uint8)
+                                           .reshape(len(digit_tables), -1))
+    return TRANSFORM_TABLES['arrays', box]
+
+def transform_batch(seeds, count, rng=random):
+    # `count` transform_cells results from `seeds` (a list of joined puzzle
+    # and solution bytes) as a (count, 2 * cells) uint8 array.  Each random
+    # transformation is applied to every seed at once, which keeps NumPy
+    # working on whole blocks.  Needs NumPy.
+    box = math.isqrt(math.isqrt(len(seeds[0]) // 2))
+    rows, cols, digits = transform_arrays(box)
+    source = np.frombuffer(b''.join(seeds), dtype=np.uint8).reshape(len(seeds), -1)
+    out = np.empty((count, source.shape[1]), dtype=np.uint8)
+    for start in range(0, count, len(seeds)):
+        pick = rng.getrandbits(64)
+        order = rows[pick % len(rows)][cols[pick // len(rows) % len(cols)]]
+        table = digits[pick // len(rows) // len(cols) % len(digits)]
+        block = table[source[:, order]]
+        out[start:start + len(seeds)] = block[:count - start]
+    return out
+
+class SeedPool:
+    """Verified puzzles per level, and any number of puzzles derived from them.
+
+    derive() picks a seed at random and applies a random transformation
+    from transform_cells(), so it never searches.  Seeds are added with
+    add(); with `refresh`, a spawned worker keeps generating fresh ones,
+    which poll() collects and which push out the oldest once a level holds
+    `size`.  The transformations are drawn from `rng`, so a seeded pool
+    without refresh derives the same puzzles every run.
+    """
+
+    def __init__(self, levels, size=64, refresh=True, executor=None, rng=None, refresh_chunk=8):
+        self.seeds = {level: collections.deque(maxlen=size) for level in levels}
+        self.pending = {level: None for level in levels}
+        self.rng = rng or random.Random()
+        self.refresh_chunk = refresh_chunk
+        self.derived = 0
+        self.refreshed = 0
+        if refresh and executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        self.executor = executor if refresh else None
+        self.poll()
+
+    def add(self, level, pairs):
+        for puzzle, solution in pairs:
+            if isinstance(puzzle, str):
+                puzzle, solution = board_from_string(puzzle), board_from_string(solution)
+            self.seeds[level].append(bytes(board_cells(puzzle)) + bytes(board_cells(solution)))
+
+    def poll(self):
+        # Collects finished seeds and keeps one refresh in flight per level.
+        if self.executor is None:
+            return
+        try:
+            for level, future in self.pending.items():
+                if future is not None and future.done():
+                    if not future.cancelled() and future.exception() is None:
+                        pairs = future.result()[1]
+                        self.add(level, pairs)
+                        self.refreshed += len(pairs)
+                    future = None
+                if future is None:
+                    self.pending[level] = self.executor.submit(generate_chunk, (0, level, self.refresh_chunk, None, False, False))
+        except (concurrent.futures.BrokenExecutor, RuntimeError):
+            self.executor = None
+
+    def derive(self, level, count=1, text=False):
+        # `count` (puzzle, solution) pairs as bytes of cell values, or as
+        # board strings with `text`.  Large batches go through NumPy when
+        # it is installed.  Waits for the first refresh if the level has no
+        # seeds yet.
+        seeds = self.seeds[level]
+        if not seeds and self.pending.get(level) is not None:
+            self.pending[level].result()
+            self.poll()
+        if not seeds:
+            raise ValueError(f'no seed puzzles for {level}')
+        rng = self.rng
+        area = len(seeds[0]) // 2
+        if count >= TRANSFORM_BATCH and load_numpy():
+            data = transform_batch(list(seeds), count, rng).tobytes()
+        else:
+            data = b''.join(transform_cells(seeds[rng.randrange(len(seeds))], rng) for _ in range(count))
+        if text:
+            data = data.translate(DIGIT_BYTES).decode()
+        self.derived += count
+        return [(data[k:k + area], data[k + area:k + 2 * area]) for k in range(0, len(data), 2 * area)]
+
+    def puzzle(self, level):
+        # A derived (puzzle, solution) pair of Boards, as Sudoku(puzzle=...) takes.
+        puzzle, solution = self.derive(level)[0]
+        size = math.isqrt(len(puzzle))
+        return Board(puzzle, size), Board(solution, size)
+
+    def stats(self):
+        return {'derived': self.derived, 'refreshed': self.refreshed,
+                'seeds': {level: len(seeds) for level, seeds in self.seeds.items()}}
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+
+def transform_stream(level, count, pool_size=64, jobs=0, seed=None, chunk_size=4096):
+    # Like generate_stream, but only `pool_size` puzzles are generated (in
+    # parallel, seeded like `generate`) and the rest are derived from
+    # them.  Unseeded runs keep refreshing the pool in the background;
+    # seeded runs do not, so their output only depends on the seed.
+    pool = SeedPool([level], pool_size, refresh=seed is None, rng=random.Random(seed))
+    try:
+        for pairs in generate_stream(level, pool_size, jobs, seed):
+            pool.add(level, pairs)
+        done = 0
+        start = time.perf_counter()
+        while done < count:
+            n = min(chunk_size, count - done)
+            yield pool.derive(level, n, text=True)
+            done += n
+            pool.poll()
+        elapsed = time.perf_counter() - start
+        print(f'{done} {level} puzzles derived from {len(pool.seeds[level])} seeds in {elapsed:.2f}s, '
+              f'{done / elapsed:.0f} puzzles/sec ({pool.refreshed} seeds refreshed)', file=sys.stderr)
+    finally:
+        pool.close()
+
+# Puzzle bank: fixed-width records behind a small per-level index, read
+# through mmap so picking a puzzle never parses or loads the whole file.
+#
+#   header:  magic (8s), level count (I)
+#            per level: name (16s), first record (Q), record count (Q)
+#   record:  solution as 81 packed nibbles (41 bytes) followed by an
+#            81-bit little-endian mask of the given cells (11 bytes)
+BANK_MAGIC = b'SDKBANK1'
+BANK_HEADER = struct.Struct('<8sI')
+BANK_LEVEL = struct.Struct('<16sQQ')
+BANK_RECORD_SIZE = 52
+DEFAULT_BANK_PATH = os.path.join(SCRIPT_DIR, 'sudoku.bank')
+NIBBLE_PAIRS = [(b >> 4, b & 15) for b in range(256)]
+
+def pack_record(puzzle, solution):
+    digits = board_cells(solution) + [0]
+    givens = 0
+    for i, v in enumerate(board_cells(puzzle)):
+        if v:
+            givens |= 1 << i
+    return bytes(digits[k] << 4 | digits[k + 1] for k in range(0, 82, 2)) + givens.to_bytes(11, 'little')
+
+def unpack_record(data):
+    digits = []
+    for b in data[:41]:
+        digits.extend(NIBBLE_PAIRS[b])
+    givens = int.from_bytes(data[41:52], 'little')
+    puzzle = [digits[i] if givens >> i & 1 else 0 for i in range(81)]
+    return Board(puzzle), Board(digits[:81])
+
+def write_puzzle_bank(path, levels):
+    # `levels` maps a level name to an iterable of (puzzle, solution) boards.
+    # Records are streamed to a temporary file that replaces `path` at the
+    # end, and the index is filled in once every level is written.
+    tmp_path = path + '.tmp'
+    index = []
+    with open(tmp_path, 'wb') as f:
+        header_size = BANK_HEADER.size + BANK_LEVEL.size * len(levels)
+        f.write(b'\0' * header_size)
+        total = 0
+        for level, records in levels.items():
+            first = total
+            for puzzle, solution in records:
+                f.write(pack_record(puzzle, solution))
+                total += 1
+            index.append((level, first, total - first))
+        f.seek(0)
+        f.write(BANK_HEADER.pack(BANK_MAGIC, len(index)))
+        for level, first, count in index:
+            f.write(BANK_LEVEL.pack(level.encode(), first, count))
+    os.replace(tmp_path, path)
+
+class PuzzleBank:
+    def __init__(self, path):
+        # An empty, truncated or foreign file raises ValueError, with the
+        # file closed again.
+        self.path = path
+        self.file = open(path, 'rb')
+        self.data = None
+        try:
+            self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+            magic, level_count = BANK_HEADER.unpack_from(self.data, 0)
+            if magic != BANK_MAGIC:
+                raise ValueError('wrong magic number')
+            self.levels = {}
+            for k in range(level_count):
+                name, first, count = BANK_LEVEL.unpack_from(self.data, BANK_HEADER.size + k * BANK_LEVEL.size)
+                self.levels[name.rstrip(b'\0').decode()] = (first, count)
+            self.records_offset = BANK_HEADER.size + level_count * BANK_LEVEL.size
+        except (struct.error, ValueError) as e:
+            self.close()
+            raise ValueError(f'{path} is not a puzzle bank: {e}') from e
+        except BaseException:
+            self.close()
+            raise
+
+    @classmethod
+    def open_default(cls):
+        # The bank next to sudoku.py, or None when there is no usable one.
+        try:
+            return cls(DEFAULT_BANK_PATH)
+        except (OSError, ValueError):
+            return None
+
+    def count(self, level):
+        return self.levels.get(level, (0, 0))[1]
+
+    def get(self, level, index):
+        first, count = self.levels[level]
+        if not 0 <= index < count:
+            raise IndexError(index)
+        offset = self.records_offset + (first + index) * BANK_RECORD_SIZE
+        return unpack_record(self.data[offset:offset + BANK_RECORD_SIZE])
+
+    def random_puzzle(self, level):
+        count = self.count(level)
+        if not count:
+            return None
+        return self.get(level, random.randrange(count))
+
+    def close(self):
+        if self.data is not None:
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def run_bank(args):
+    # Generation is lazy, so each level streams straight into the file.
+    stats = SolverStats() if args.stats else None
+    dedup = open_deduplicator(args)
+    def records(level):
+        for pairs in generate_stream(level, args.count, args.jobs, args.seed, args.chunk_size, args.symmetric, stats=stats):
+            for puzzle, solution in pairs:
+                if dedup is None or dedup.add(puzzle):
+                    yield board_from_string(puzzle), board_from_string(solution)
+    try:
+        write_puzzle_bank(args.output, {level: records(level) for level in args.levels})
+    finally:
+        if dedup:
+            dedup.close()
+    with PuzzleBank(args.output) as bank:
+        sizes = ', '.join(f'{level}: {bank.count(level)}' for level in bank.levels)
+    print(f'wrote {args.output} ({sizes})', file=sys.stderr)
+    if stats:
+        print(f'solver: {stats.summary()}', file=sys.stderr)
+    if dedup:
+        print(f'dedup: {dedup.summary()}', file=sys.stderr)
+    return 0
+
+# Puzzle service: `python sudoku.py serve` answers JSON requests over HTTP.
+# The event loop only parses requests and routes them; generating, solving
+# and hinting run in a process pool.
+#
+#   GET  /generate?level=Easy&seed=42   puzzle and solution (cached by seed)
+#   POST /solve     {"board": "..."}    solution, or null if there is none
+#   POST /validate  {"board": "..."}    conflicting cells and solution count
+#   POST /hint      {"board": "..."}    one empty cell and its digit
+#   GET  /stats                         service counters
+#
+# Boards are 81-, 256- or 625-character strings as written by
+# board_to_string.  Parameters may also be given in the query string.
+SERVICE_MAX_BODY = 65536
+SERVICE_IDLE_TIMEOUT = 30.0
+HTTP_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+                413: 'Payload Too Large', 500: 'Internal Server Error', 503: 'Service Unavailable'}
+
+class ServiceBusy(Exception):
+    pass
+
+def parse_service_board(text):
+    if not isinstance(text, str):
+        raise ValueError('board must be a string')
+    board = board_from_string(text)
+    if max(board.cells) > board.size:
+        raise ValueError(f'digit out of range for a {len(board)}x{len(board)} board')
+    return board
+
+def board_conflicts(board):
+    # Cells whose digit repeats in their row, column or box.
+    size = len(board)
+    box = math.isqrt(size)
+    conflicts = set()
+    units = [[(r, c) for c in range(size)] for r in range(size)]
+    units += [[(r, c) for r in range(size)] for c in range(size)]
+    units += [[(br + r, bc + c) for r in range(box) for c in range(box)]
+              for br in range(0, size, box) for bc in range(0, size, box)]
+    for unit in units:
+        seen = {}
+        for r, c in unit:
+            v = board[r][c]
+            if v:
+                if v in seen:
+                    conflicts.update((seen[v], (r, c)))
+                seen[v] = (r, c)
+    return sorted(conflicts)
+
+def solver_game(board):
+    return Sudoku(puzzle=(board, None), box=math.isqrt(len(board)))
+
+def service_generate(level, seed):
+    # Same seeding as chunk 0 of `generate --seed`, so a seed gives the same
+    # puzzle from the service and from the command line.
+    _, pairs, _ = generate_chunk((0, level, 1, seed, False, False))
+    puzzle, solution = pairs[0]
+    return {'level': level, 'seed': seed, 'puzzle': puzzle, 'solution': solution}
+
+def service_solve(text):
+    board = parse_service_board(text)
+    solved = board.copy()
+    ok = not board_conflicts(board) and solver_game(board).solve(solved)
+    return {'solution': board_to_string(solved) if ok else None}
+
+def service_validate(text):
+    board = parse_service_board(text)
+    conflicts = board_conflicts(board)
+    solutions = 0 if conflicts else solver_game(board).count_solutions(board, 2)
+    return {
+        'valid': not conflicts,
+        'complete': 0 not in board.cells,
+        'conflicts': [r * len(board) + c for r, c in conflicts],
+        'solutions': solutions,
+        'unique': solutions == 1,
+    }
+
+def service_board_array(texts, name):
+    # 81-char 9x9 board strings from a request, as an (N, 9, 9) array.
+    if not isinstance(texts, list) or not all(isinstance(text, str) and len(text) == 81 for text in texts):
+        raise ValueError(f'{name} must be a list of 81-character strings')
+    if ''.join(texts).encode('ascii').translate(None, b'.0123456789'):
+        raise ValueError(f'{name} may only hold digits and dots')
+    return boards_to_array(texts)
+
+def service_validate_batch(texts, solutions=None):
+    # /validate for a list of 9x9 boards, all checked at once by
+    # grade_boards().  Solutions are not counted; with `solutions`, each
+    # board is also compared with its own.
+    if not load_numpy():
+        return {'error': 'validating a list of boards needs NumPy'}
+    boards = service_board_array(texts, 'boards')
+    if solutions is not None:
+        solutions = service_board_array(solutions, 'solutions')
+        if len(solutions) != len(boards):
+            raise ValueError('solutions must match boards one to one')
+    graded = grade_boards(boards, solutions)
+    result = {
+        'valid': graded['valid'].tolist(),
+        'complete': graded['complete'].tolist(),
+        'conflicts': [np.flatnonzero(mask).tolist() for mask in graded['conflicts']],
+    }
+    if solutions is not None:
+        result['matches'] = graded['matches'].tolist()
+    return result
+
+def service_hint(text):
+    # The cell the next logical step fills, as the GUI's Hint button
+    # describes it.  When that step only eliminates candidates, the empty
+    # cell with the fewest candidates, filled from a solution.
+    board = parse_service_board(text)
+    solved = board.copy()
+    if board_conflicts(board) or not solver_game(board).solve(solved):
+        return {'error': 'board has no solution'}
+    size = len(board)
+    box = math.isqrt(size)
+
+    def candidates(r, c):
+        used = set(board[r]) | {board[i][c] for i in range(size)}
+        used.update(board[i][j] for i in range(r - r % box, r - r % box + box)
+                    for j in range(c - c % box, c - c % box + box))
+        return size + 1 - len(used | {0})
+
+    empty = [(r, c) for r in range(size) for c in range(size) if not board[r][c]]
+    if not empty:
+        return {'error': 'board is already complete'}
+    step = HintEngine(PlayTracker(board)).next_step()
+    if step and step['place']:
+        cell, digit = step['place']
+        r, c = divmod(cell, size)
+    else:
+        r, c = min(empty, key=lambda rc: candidates(*rc))
+        digit = solved[r][c]
+    return {'row': r, 'col': c, 'digit': digit, 'candidates': candidates(r, c),
+            'step': step and {key: step[key] for key in ('technique', 'text', 'cells', 'targets')}}
+
+class PuzzleService:
+    """Routes HTTP requests to a process pool.
+
+    At most `jobs * 2` jobs run in the pool at a time, and at most
+    `queue_limit` more may wait for a slot.  Past that, requests get a 503
+    instead of queueing without bound.  Identical requests that arrive
+    while one is running share its result, and seeded puzzles are kept in
+    an LRU cache of `cache_size` entries.
+    """
+
+    def __init__(self, jobs=0, queue_limit=64, cache_size=4096):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.queue_limit = queue_limit
+        self.cache_size = cache_size
+        self.cache = collections.OrderedDict()
+        self.inflight = {}
+        self.queued = 0
+        self.counters = collections.Counter()
+        self.pool = None
+        self.slots = None
+
+    async def start(self, host, port):
+        self.pool = concurrent.futures.ProcessPoolExecutor(max_workers=self.jobs)
+        self.slots = asyncio.Semaphore(self.jobs * 2)
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    async def run_in_pool(self, func, *args):
+        self.queued += 1
+        try:
+            await self.slots.acquire()
+        finally:
+            self.queued -= 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, func, *args)
+        finally:
+            self.slots.release()
+
+    async def submit(self, key, func, *args):
+        # A request whose key is already running waits on that job instead.
+        # shield() keeps a shared job alive if one of its clients goes away.
+        running = self.inflight.get(key)
+        if running is not None:
+            self.counters['coalesced'] += 1
+            return await asyncio.shield(running)
+        if self.queued >= self.queue_limit:
+            self.counters['rejected'] += 1
+            raise ServiceBusy()
+        job = asyncio.ensure_future(self.run_in_pool(func, *args))
+        if key is not None:
+            self.inflight[key] = job
+            job.add_done_callback(lambda _: self.inflight.pop(key, None))
+        return await asyncio.shield(job)
+
+    async def generate(self, params):
+        level = params.get('level', 'Easy')
+        if level not in LEVEL_REMOVALS:
+            raise ValueError(f'unknown level {level!r}')
+        seed = params.get('seed')
+        if seed is None:
+            return await self.submit(None, service_generate, level, None)
+        seed = int(seed)
+        key = ('generate', level, seed)
+        if key in self.cache:
+            self.counters['cache_hits'] += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        self.counters['cache_misses'] += 1
+        result = await self.submit(key, service_generate, level, seed)
+        self.cache[key] = result
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return result
+
+    async def validate(self, params):
+        if 'boards' in params:
+            return await self.submit(None, service_validate_batch, params['boards'], params.get('solutions'))
+        return await self.board_job('validate', service_validate, params)
+
+    async def board_job(self, name, func, params):
+        board = params.get('board')
+        parse_service_board(board)
+        return await self.submit((name, board), func, board)
+
+    def stats(self):
+        return dict(self.counters, queued=self.queued, running=len(self.inflight), cached=len(self.cache), jobs=self.jobs)
+
+    async def dispatch(self, method, target, body):
+        url = urllib.parse.urlsplit(target)
+        params = dict(urllib.parse.parse_qsl(url.query))
+        if body:
+            data = json.loads(body)
+            if not isinstance(data, dict):
+                raise ValueError('request body must be a JSON object')
+            params.update(data)
+        routes = {
+            '/generate': lambda: self.generate(params),
+            '/solve': lambda: self.board_job('solve', service_solve, params),
+            '/validate': lambda: self.validate(params),
+            '/hint': lambda: self.board_job('hint', service_hint, params),
+        }
+        if url.path == '/stats':
+            return 200, self.stats()
+        if url.path not in routes:
+            return 404, {'error': f'no such endpoint {url.path}'}
+        if method not in ('GET', 'POST'):
+            return 405, {'error': f'{method} not allowed'}
+        self.counters[url.path.lstrip('/')] += 1
+        result = await routes[url.path]()
+        return (400 if 'error' in result else 200), result
+
+    async def respond(self, method, target, body):
+        try:
+            return await self.dispatch(method, target, body)
+        except ServiceBusy:
+            return 503, {'error': 'too many queued requests, retry later'}
+        except (ValueError, TypeError) as e:
+            return 400, {'error': str(e)}
+        except Exception as e:
+            self.counters['errors'] += 1
+            return 500, {'error': f'{type(e).__name__}: {e}'}
+
+    async def read_head(self, reader, line):
+        # (method, target, version, headers) of one request; ValueError if
+        # the request line or Content-Length is malformed.
+        parts = line.decode('latin-1').split()
+        if len(parts) != 3 or not parts[2].startswith('HTTP/'):
+            raise ValueError('malformed request line')
+        headers = {}
+        while True:
+            header = await reader.readline()
+            if header in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = header.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        length = headers.get('content-length', '0')
+        if not length.isdigit():
+            raise ValueError('malformed Content-Length')
+        headers['content-length'] = int(length)
+        return (*parts, headers)
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 with keep-alive; requests on a connection are answered in
+        # order.  Idle connections are closed after SERVICE_IDLE_TIMEOUT.  A
+        # request that cannot be parsed gets a 400 and ends the connection.
+        try:
+            while True:
+                line = await asyncio.wait_for(reader.readline(), SERVICE_IDLE_TIMEOUT)
+                if not line.strip():
+                    break
+                version = 'HTTP/1.1'
+                keep_alive = False
+                try:
+                    method, target, version, headers = await self.read_head(reader, line)
+                except ValueError as e:
+                    status, result = 400, {'error': str(e)}
+                else:
+                    length = headers['content-length']
+                    if length > SERVICE_MAX_BODY:
+                        status, result = 413, {'error': 'request body too large'}
+                    else:
+                        body = await reader.readexactly(length) if length else b''
+                        status, result = await self.respond(method, target, body)
+                        keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                payload = json.dumps(result).encode()
+                head = [f'{version} {status} {HTTP_REASONS[status]}', 'Content-Type: application/json',
+                        f'Content-Length: {len(payload)}', f'Connection: {"keep-alive" if keep_alive else "close"}']
+                if status == 503:
+                    head.append('Retry-After: 1')
+                writer.write(('\r\n'.join(head) + '\r\n\r\n').encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+def run_serve(args):
+    service = PuzzleService(args.jobs, args.queue, args.cache)
+    async def serve():
+        server = await service.start(args.host, args.port)
+        # Ctrl-C and SIGTERM stop the server cleanly so the pool shuts down.
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            asyncio.get_running_loop().add_signal_handler(sig, stop.set)
+        print(f'serving on http://{args.host}:{args.port} with {service.jobs} workers', file=sys.stderr)
+        async with server:
+            await stop.wait()
+    try:
+        asyncio.run(serve())
+    finally:
+        service.close()
+    return 0
+
+class PuzzleBuffer:
+    """A few ready puzzles per level, refilled in the background.
+
+    Puzzles are generated by `executor` (a single spawned worker process by
+    default, so tkinter is never loaded there) and collected by poll(),
+    which the GUI calls from root.after.  hits and misses count pop() calls
+    that did and did not find a ready puzzle.  With `path`, puzzles still
+    ready at close() are saved there and loaded by the next buffer, once.
+    """
+
+    def __init__(self, levels, size=3, executor=None, path=None):
+        self.size = size
+        self.path = path
+        self.ready = {level: collections.deque() for level in levels}
+        self.pending = {level: [] for level in levels}
+        self.hits = 0
+        self.misses = 0
+        if path:
+            self.load(path)
+        if executor is None:
+            executor = concurrent.futures.ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn'))
+        self.executor = executor
+        self.refill()
+
+    def refill(self):
+        if self.executor is None:
+            return
+        try:
+            for level, futures in self.pending.items():
+                for _ in range(self.size - len(self.ready[level]) - len(futures)):
+                    futures.append(self.executor.submit(generate_chunk, (0, level, 1, None, False, False)))
+        except (concurrent.futures.BrokenExecutor, RuntimeError):
+            self.executor = None
+
+    def poll(self):
+        for level, futures in self.pending.items():
+            for future in [f for f in futures if f.done()]:
+                futures.remove(future)
+                if future.cancelled() or future.exception() is not None:
+                    continue
+                for puzzle, solution in future.result()[1]:
+                    self.ready[level].append((board_from_string(puzzle), board_from_string(solution)))
+        self.refill()
+
+    def pop(self, level):
+        ready = self.ready.get(level)
+        if not ready:
+            self.misses += 1
+            return None
+        self.hits += 1
+        puzzle = ready.popleft()
+        self.refill()
+        return puzzle
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses,
+                'ready': {level: len(ready) for level, ready in self.ready.items()}}
+
+    def load(self, path):
+        try:
+            with open(path) as f:
+                saved = json.load(f)
+            os.remove(path)
+        except (OSError, ValueError):
+            return
+        for level, pairs in saved.items():
+            if level in self.ready:
+                for puzzle, solution in pairs[:self.size]:
+                    self.ready[level].append((board_from_string(puzzle), board_from_string(solution)))
+
+    def save(self, path):
+        saved = {level: [[board_to_string(p), board_to_string(s)] for p, s in ready]
+                 for level, ready in self.ready.items() if ready}
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + '.tmp', 'w') as f:
+                json.dump(saved, f)
+            os.replace(path + '.tmp', path)
+        except OSError:
+            pass
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        if self.path:
+            self.save(self.path)
+
+class BackgroundCache:
+    """Board background images scaled to the board size.
+
+    PhotoImages are kept in memory, keyed by (path, mtime, size), and the
+    least recently used one is dropped past `capacity`.  Scaled images are
+    also written to `cache_dir` as PPM files, so a new session can skip
+    the JPEG decode too.  A first load decodes the JPEG in draft mode at a
+    reduced DCT scale before resampling.  load_scaled() only uses PIL, so
+    it can run on a worker thread; the PhotoImage is made by add() on the
+    Tk thread.
+    """
+
+    def __init__(self, capacity=4, cache_dir=IMAGE_CACHE_DIR):
+        self.capacity = capacity
+        self.cache_dir = cache_dir
+        self.images = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, path, size):
+        path = os.path.abspath(path)
+        return path, os.stat(path).st_mtime_ns, size
+
+    def get(self, path, size):
+        key = self.key(path, size)
+        return self.cached(key) or self.add(key, self.load_scaled(key))
+
+    def cached(self, key):
+        photo = self.images.get(key)
+        if photo is None:
+            self.misses += 1
+            return None
+        self.images.move_to_end(key)
+        self.hits += 1
+        return photo
+
+    def add(self, key, img):
+        load_image_modules()
+        photo = ImageTk.PhotoImage(img)
+        self.images[key] = photo
+        while len(self.images) > self.capacity:
+            self.images.popitem(last=False)
+        return photo
+
+    def load_scaled(self, key):
+        load_image_modules()
+        path, _, size = key
+        cached = os.path.join(self.cache_dir, hashlib.sha1(repr(key).encode()).hexdigest() + '.ppm')
+        try:
+            img = Image.open(cached)
+            img.load()
+            return img
+        except OSError:
+            pass
+        img = Image.open(path)
+        # Let the draft decode land up to 20% under the board size; the small
+        # upscale is not visible behind the grid and halves the decode time
+        # for the bundled 2752x1536 photos.
+        img.draft('RGB', (size * 4 // 5, size * 4 // 5))
+        img = img.convert('RGB').resize((size, size), Image.LANCZOS)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            img.save(cached + '.tmp', 'PPM')
+            os.replace(cached + '.tmp', cached)
+        except OSError:
+            pass
+        return img
+
+UNIT_TABLES = {}
+
+def unit_tables(size):
+    # For a size x size board: rows, then columns, then boxes as lists of
+    # cell indices; the (row, column, box) unit numbers of every cell; and
+    # every box/line crossing as (box unit, line unit, segment, rest of
+    # line, rest of box).
+    if size in UNIT_TABLES:
+        return UNIT_TABLES[size]
+    box = math.isqrt(size)
+    rows = [[r * size + c for c in range(size)] for r in range(size)]
+    cols = [[r * size + c for r in range(size)] for c in range(size)]
+    boxes = [[(br + r) * size + bc + c for r in range(box) for c in range(box)]
+             for br in range(0, size, box) for bc in range(0, size, box)]
+    units = rows + cols + boxes
+    cell_units = [(i // size, size + i % size, 2 * size + i // size // box * box + i % size // box)
+                  for i in range(size * size)]
+    crossings = []
+    for b, members in enumerate(boxes):
+        for u in sorted({cell_units[i][k] for i in members for k in (0, 1)}):
+            line = units[u]
+            crossings.append((2 * size + b, u, [i for i in line if i in members],
+                              [i for i in line if i not in members], [i for i in members if i not in line]))
+    UNIT_TABLES[size] = units, cell_units, crossings
+    return UNIT_TABLES[size]
+
+class PlayTracker:
+    """Live state of a game in progress, updated one cell at a time.
+
+    set(r, c, digit) adjusts the count of correctly filled cells and the
+    per-row, column and box digit counts in O(1), so `solved` and
+    `conflicts` are read off those counts without rescanning the board.
+    `conflicts` is the number of (unit, digit) pairs that occur more than
+    once.  Each unit also keeps a bitmask of the digits it holds, which
+    gives any cell's candidates in O(1).  It needs no display and can be
+    driven directly.
+    """
+
+    def __init__(self, puzzle, solution=None):
+        size = puzzle.size
+        self.size = size
+        self.units, self.cell_units, self.crossings = unit_tables(size)
+        self.all_digits = (1 << size + 1) - 2
+        self.givens = puzzle.cells
+        self.solution = solution.cells if solution is not None else None
+        self.board = puzzle.copy()
+        self.counts = [[0] * (size + 1) for _ in range(3 * size)]
+        self.bits = [0] * (3 * size)
+        # Candidates ruled out by hints; only valid while no entry is
+        # erased or changed, since removing a digit can bring them back.
+        self.pruned = [0] * (size * size)
+        self.open = puzzle.cells.count(0)
+        self.entered = set()
+        self.correct = 0
+        self.conflicts = 0
+        for i, d in enumerate(puzzle.cells):
+            if d:
+                self.count(i, d, 1)
+
+    def count(self, i, d, delta):
+        for u in self.cell_units[i]:
+            counts = self.counts[u]
+            n = counts[d]
+            if (delta > 0 and n == 1) or (delta < 0 and n == 2):
+                self.conflicts += delta
+            if n == 0 or n + delta == 0:
+                self.bits[u] ^= 1 << d
+            counts[d] = n + delta
+
+    def set(self, r, c, d):
+        # Givens never change; anything else may be set to 0..size.
+        i = r * self.size + c
+        old = self.board.cells[i]
+        if self.givens[i] or old == d:
+            return
+        if old:
+            self.count(i, old, -1)
+            self.entered.discard(i)
+            self.pruned = [0] * len(self.pruned)
+            if self.solution is not None and old == self.solution[i]:
+                self.correct -= 1
+        self.board.cells[i] = d
+        if d:
+            self.count(i, d, 1)
+            self.entered.add(i)
+            if self.solution is not None and d == self.solution[i]:
+                self.correct += 1
+
+    def candidates(self, i):
+        if self.board.cells[i]:
+            return 0
+        r, c, b = self.cell_units[i]
+        return self.all_digits & ~(self.bits[r] | self.bits[c] | self.bits[b] | self.pruned[i])
+
+    def is_correct(self, r, c):
+        i = r * self.size + c
+        return self.solution is not None and self.board.cells[i] == self.solution[i]
+
+    def is_conflict(self, r, c):
+        i = r * self.size + c
+        d = self.board.cells[i]
+        return bool(d) and any(self.counts[u][d] > 1 for u in self.cell_units[i])
+
+    @property
+    def filled(self):
+        return len(self.entered)
+
+    @property
+    def solved(self):
+        return self.correct == self.open
+
+def mask_digits(mask):
+    return [d for d in range(1, mask.bit_length()) if mask >> d & 1]
+
+class HintEngine:
+    """Finds the next logical step on a PlayTracker's board.
+
+    Candidates come straight from the tracker's unit masks, so a hint only
+    searches for one step in TECHNIQUES order instead of solving the
+    board.  next_step() returns a dict with 'technique', a readable
+    'text', the 'cells' that make up the pattern and the 'targets' it
+    changes: either 'place' (cell, digit) or 'eliminate', a list of
+    (cell, digits).  Eliminations are kept in the tracker, so the next
+    call moves on, until an entry is erased.
+    """
+
+    SUBSET_NAMES = {2: 'pair', 3: 'triple'}
+
+    def __init__(self, play):
+        self.play = play
+
+    def cell_name(self, i):
+        return f'r{i // self.play.size + 1}c{i % self.play.size + 1}'
+
+    def unit_name(self, u):
+        kind, n = divmod(u, self.play.size)
+        return f'{("row", "column", "box")[kind]} {n + 1}'
+
+    def cell_list(self, cells):
+        return ', '.join(self.cell_name(i) for i in cells)
+
+    def step(self, technique, text, cells, targets, place=None, eliminate=()):
+        for i, digits in eliminate:
+            self.play.pruned[i] |= sum(1 << d for d in digits)
+        return {'technique': technique, 'text': text, 'cells': list(cells), 'targets': list(targets),
+                'place': place, 'eliminate': list(eliminate)}
+
+    def next_step(self):
+        play = self.play
+        if play.conflicts:
+            return self.conflict()
+        cand = [play.candidates(i) for i in range(play.size * play.size)]
+        for i, m in enumerate(cand):
+            if not m and not play.board.cells[i]:
+                return self.step('dead end', f'no digit fits at {self.cell_name(i)}, so an entry is wrong', [i], [i])
+        for name, rating, method, args in TECHNIQUES:
+            found = getattr(self, method)(name, cand, *args)
+            if found:
+                return found
+        return None
+
+    def conflict(self):
+        play = self.play
+        for u, counts in enumerate(play.counts):
+            for d, n in enumerate(counts):
+                if n > 1:
+                    cells = [i for i in play.units[u] if play.board.cells[i] == d]
+                    return self.step('conflict', f'{d} appears {n} times in {self.unit_name(u)}', cells, cells)
+        return None
+
+    def hidden_singles(self, name, cand):
+        # Boxes first, which is where people tend to look.
+        play = self.play
+        size = play.size
+        for u in list(range(2 * size, 3 * size)) + list(range(2 * size)):
+            unit = play.units[u]
+            once = twice = 0
+            for i in unit:
+                twice |= once & cand[i]
+                once |= cand[i]
+            missing = play.all_digits & ~(once | play.bits[u])
+            if missing:
+                d = mask_digits(missing)[0]
+                return self.step('dead end', f'{d} has no place left in {self.unit_name(u)}, so an entry is wrong', unit, unit)
+            hidden = once & ~twice
+            if hidden:
+                d = mask_digits(hidden)[0]
+                i = next(i for i in unit if cand[i] >> d & 1)
+                return self.step(name, f'{name}: {d} in {self.unit_name(u)} at {self.cell_name(i)}', unit, [i], place=(i, d))
+        return None
+
+    def naked_singles(self, name, cand):
+        for i, m in enumerate(cand):
+            if m and not m & (m - 1):
+                d = m.bit_length() - 1
+                return self.step(name, f'{name}: {d} is the only digit left for {self.cell_name(i)}', [i], [i], place=(i, d))
+        return None
+
+    def locked_candidates(self, name, cand):
+        # Pointing: a digit confined to one line within a box leaves the
+        # rest of that line.  Claiming: confined to one box within a line,
+        # it leaves the rest of that box.
+        for box_u, line_u, segment, line_rest, box_rest in self.play.crossings:
+            seg = 0
+            for i in segment:
+                seg |= cand[i]
+            if not seg:
+                continue
+            line_mask = box_mask = 0
+            for i in line_rest:
+                line_mask |= cand[i]
+            for i in box_rest:
+                box_mask |= cand[i]
+            for only, inside, outside, rest in ((seg & ~box_mask & line_mask, box_u, line_u, line_rest),
+                                                (seg & ~line_mask & box_mask, line_u, box_u, box_rest)):
+                if only:
+                    d = mask_digits(only)[0]
+                    targets = [i for i in rest if cand[i] >> d & 1]
+                    return self.step(name, f'{name}: {d} in {self.unit_name(inside)} only fits in {self.unit_name(outside)}, '
+                                     f'so {self.cell_list(targets)} cannot be {d}',
+                                     [i for i in segment if cand[i] >> d & 1], targets,
+                                     eliminate=[(i, [d]) for i in targets])
+        return None
+
+    def naked_subsets(self, name, cand, k):
+        for u, unit in enumerate(self.play.units):
+            cells = [i for i in unit if 2 <= bin(cand[i]).count('1') <= k]
+            for group in itertools.combinations(cells, k):
+                mask = 0
+                for i in group:
+                    mask |= cand[i]
+                if bin(mask).count('1') != k:
+                    continue
+                targets = [i for i in unit if i not in group and cand[i] & mask]
+                if targets:
+                    digits = mask_digits(mask)
+                    return self.step(name, f'{name}: {self.cell_list(group)} only hold {"/".join(map(str, digits))} '
+                                     f'in {self.unit_name(u)}, so remove them from {self.cell_list(targets)}',
+                                     group, targets, eliminate=[(i, mask_digits(cand[i] & mask)) for i in targets])
+        return None
+
+    def hidden_subsets(self, name, cand, k):
+        size = self.play.size
+        for u, unit in enumerate(self.play.units):
+            places = {}
+            for d in range(1, size + 1):
+                where = [i for i in unit if cand[i] >> d & 1]
+                if 2 <= len(where) <= k:
+                    places[d] = where
+            for digits in itertools.combinations(places, k):
+                cells = sorted({i for d in digits for i in places[d]})
+                if len(cells) != k:
+                    continue
+                keep = sum(1 << d for d in digits)
+                targets = [i for i in cells if cand[i] & ~keep]
+                if targets:
+                    return self.step(name, f'{name}: {"/".join(map(str, digits))} in {self.unit_name(u)} only fit '
+                                     f'{self.cell_list(cells)}, so those cells hold nothing else',
+                                     cells, targets, eliminate=[(i, mask_digits(cand[i] & ~keep)) for i in targets])
+        return None
+
+    def x_wings(self, name, cand):
+        size = self.play.size
+        units = self.play.units
+        rows, cols = units[:size], units[size:2 * size]
+        for d in range(1, size + 1):
+            for lines, cross, kind, other in ((rows, cols, 'rows', 'columns'), (cols, rows, 'columns', 'rows')):
+                pairs = {}
+                for k, line in enumerate(lines):
+                    where = tuple(n for n, i in enumerate(line) if cand[i] >> d & 1)
+                    if len(where) == 2:
+                        pairs.setdefault(where, []).append(k)
+                for (a, b), found in pairs.items():
+                    for first, second in itertools.combinations(found, 2):
+                        corners = [lines[first][a], lines[first][b], lines[second][a], lines[second][b]]
+                        targets = [i for n in (a, b) for i in cross[n] if cand[i] >> d & 1 and i not in corners]
+                        if targets:
+                            return self.step(name, f'{name}: {d} in {kind} {first + 1} and {second + 1} only fits {other} '
+                                             f'{a + 1} and {b + 1}, so {self.cell_list(targets)} cannot be {d}',
+                                             corners, targets, eliminate=[(i, [d]) for i in targets])
+        return None
+
+class FrameScheduler:
+    """Deferred calls and animations driven by Tk `after` callbacks.
+
+    call_later(key, ms, fn) runs fn once; while a call for `key` is
+    waiting, further requests for the same key are dropped, so repeated
+    triggers coalesce into one.  animate(key, frames, ms) steps a generator
+    one frame per callback; a frame may yield its own delay.  An animation
+    can own a canvas tag, whose items are deleted when it ends or is
+    cancelled.  watch(key, future, fn) polls a worker-thread future and
+    calls fn with it on the Tk thread; watching a key again replaces the
+    earlier watch.  Nothing here blocks the event loop.
+    """
+
+    def __init__(self, root, canvas=None):
+        self.root = root
+        self.canvas = canvas
+        self.jobs = {}
+        self.tags = {}
+
+    def call_later(self, key, delay, fn, *args):
+        if key in self.jobs:
+            return False
+        def run():
+            del self.jobs[key]
+            fn(*args)
+        self.jobs[key] = self.root.after(delay, run)
+        return True
+
+    def animate(self, key, frames, interval, tag=None, done=None):
+        # Replaces any animation already running under `key`; items the
+        # caller has already drawn under `tag` are kept.
+        self.stop(key)
+        if tag:
+            self.tags[key] = tag
+        def tick():
+            try:
+                delay = next(frames)
+            except StopIteration:
+                del self.jobs[key]
+                self.clear(key)
+                if done:
+                    done()
+                return
+            self.jobs[key] = self.root.after(interval if delay is None else delay, tick)
+        self.jobs[key] = self.root.after_idle(tick)
+
+    def watch(self, key, future, fn, interval=50):
+        # Calls fn(future) on the Tk thread once `future` is done.  Watching
+        # a key again replaces the earlier watch, whose fn is never called.
+        self.stop(key)
+        def check():
+            if future.done():
+                fn(future)
+            else:
+                self.call_later(key, interval, check)
+        self.call_later(key, 0, check)
+
+    def clear(self, key):
+        tag = self.tags.pop(key, None)
+        if tag and self.canvas is not None:
+            self.canvas.delete(tag)
+
+    def stop(self, key):
+        job = self.jobs.pop(key, None)
+        if job is not None:
+            self.root.after_cancel(job)
+
+    def cancel(self, key):
+        self.stop(key)
+        self.clear(key)
+
+    def cancel_all(self):
+        for key in list(self.jobs) + list(self.tags):
+            self.cancel(key)
+
+    def pending(self, key):
+        return key in self.jobs
 
 class SudokuGUI:
-    def __init__(self, root):
+    def __init__(self, root, startup=None):
+        # The window is drawn before anything slow happens: backgrounds are
+        # found and decoded on a worker thread, and the first puzzle comes
+        # from the saved buffer or the bank, or is generated on that thread
+        # while an empty board shows.  `startup` is a perf_counter() start
+        # time; when given, milestones are printed to stderr.
+        load_gui_modules()
+        self.startup = startup
         self.root = root
         self.root.title('Sudoku Game')
         self.bg_image = None
         self.bg_path = None
-        self.sudoku = Sudoku('Easy')
+        self.bg_cache = BackgroundCache()
+        self.loader = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.bank = PuzzleBank.open_default()
+        self.puzzle_buffer = PuzzleBuffer(list(LEVEL_REMOVALS), path=BUFFER_CACHE_PATH)
+        stored = self.puzzle_buffer.pop('Easy') or (self.bank and self.bank.random_puzzle('Easy'))
+        self.loading = not stored
+        self.sudoku = Sudoku('Easy', puzzle=stored or (Board(), Board()))
+        self.play = PlayTracker(self.sudoku.board, self.sudoku.solution)
+        self.hint_engine = HintEngine(self.play)
+        self.hinted = set()
         self.level_var = tk.StringVar(value='Easy')
-        self.entries = [[None for _ in range(9)] for _ in range(9)]
-        self.bg_files = self.get_jpg_files()
+        self.size_var = tk.StringVar(value='9x9')
+        self.revealed = False
+        self.game_number = 0
+        self.status_var = tk.StringVar(value='Ready')
+        self.stats_enabled = tk.BooleanVar(value=False)
+        self.bg_files = []
         self.bg_dropdown_var = tk.StringVar()
-        if self.bg_files:
-            self.bg_path = self.bg_files[0][0]
-            self.bg_dropdown_var.set(self.bg_files[0][1])
+        self.celebrated = False
         self.create_layout()
+        self.scheduler = FrameScheduler(self.root, self.canvas)
         self.draw_board()
+        self.root.protocol('WM_DELETE_WINDOW', self.close)
+        self.root.after_idle(self.mark, 'first frame')
+        if self.loading:
+            self.scheduler.watch('puzzle', self.loader.submit(Sudoku, 'Easy'), self.first_puzzle_ready)
+        else:
+            self.mark('puzzle ready')
+        self.scheduler.watch('backgrounds', self.loader.submit(self.get_jpg_files), self.backgrounds_found)
+        self.poll_puzzle_buffer()
+
+    def mark(self, milestone):
+        if self.startup is not None:
+            print(f'startup: {milestone} at {(time.perf_counter() - self.startup) * 1000:.0f} ms', file=sys.stderr)
+
+    def first_puzzle_ready(self, future):
+        self.puzzle_ready(future)
+        self.mark('puzzle ready')
+
+    def puzzle_ready(self, future):
+        self.loading = False
+        self.start_game(future.result())
+
+    def backgrounds_found(self, future):
+        self.bg_files = future.result()
+        self.bg_dropdown.config(values=[name for _, name in self.bg_files])
+        if self.bg_files and self.bg_path is None:
+            self.bg_path = self.bg_files[0][0]
+            self.bg_dropdown_var.set(self.bg_files[0][1])
+            self.draw_background()
+
+    def poll_puzzle_buffer(self):
+        self.puzzle_buffer.poll()
+        self.scheduler.call_later('buffer', 250, self.poll_puzzle_buffer)
+
+    def close(self):
+        self.scheduler.cancel_all()
+        self.loader.shutdown(wait=False, cancel_futures=True)
+        self.puzzle_buffer.close()
+        self.root.destroy()
 
     def get_jpg_files(self):
+        # Runs on the loader thread.  Images are looked up next to sudoku.py,
+        # whatever the working directory.
         name_map = {
             'pic3.jpg': 'Alien World',
             'pic2.jpg': 'Aquarium',
             'pic.jpg': 'Forest',
         }
         files = []
-        for f in os.listdir('.'):
+        for f in sorted(os.listdir(SCRIPT_DIR)):
             if f.lower().endswith('.jpg'):
                 display_name = name_map.get(f, f)
-                files.append((os.path.abspath(f), display_name))
+                files.append((os.path.join(SCRIPT_DIR, f), display_name))
         return files
 
     def create_layout(self):
@@ -112,132 +2869,282 @@ class SudokuGUI:
         tk.Label(self.left_pane, text='Difficulty:', font=('Arial', 13), bg='#f0f0f0').pack(pady=(0,5))
         level_menu = ttk.Combobox(self.left_pane, textvariable=self.level_var, values=['Easy', 'Medium', 'Challenging'], state='readonly', width=14)
         level_menu.pack(pady=5)
+        tk.Label(self.left_pane, text='Board Size:', font=('Arial', 13), bg='#f0f0f0').pack(pady=(10,5))
+        size_menu = ttk.Combobox(self.left_pane, textvariable=self.size_var, values=list(BOARD_SIZES), state='readonly', width=14)
+        size_menu.pack(pady=5)
         tk.Button(self.left_pane, text='New Game', command=self.new_game, width=18, font=('Arial', 12)).pack(pady=8)
         tk.Button(self.left_pane, text='Hint', command=self.hint, width=18, font=('Arial', 12)).pack(pady=8)
+        tk.Button(self.left_pane, text='Check', command=self.check_entries, width=18, font=('Arial', 12)).pack(pady=8)
         tk.Button(self.left_pane, text='Solve', command=self.solve, width=18, font=('Arial', 12)).pack(pady=8)
+        tk.Checkbutton(self.left_pane, text='Solver stats', variable=self.stats_enabled, font=('Arial', 11), bg='#f0f0f0').pack(pady=4)
         tk.Label(self.left_pane, text='Background:', font=('Arial', 13), bg='#f0f0f0').pack(pady=(20,5))
         display_names = [f[1] for f in self.bg_files]
         self.bg_dropdown = ttk.Combobox(self.left_pane, textvariable=self.bg_dropdown_var, values=display_names, state='readonly', width=18)
         self.bg_dropdown.pack(pady=5)
         self.bg_dropdown.bind('<<ComboboxSelected>>', self.set_bg_from_dropdown)
+        tk.Label(self.left_pane, textvariable=self.status_var, font=('Arial', 10), fg='gray', bg='#f0f0f0', justify=tk.LEFT, wraplength=180).pack(side=tk.BOTTOM, pady=10)
         self.board_size = 900
-        self.cell_size = self.board_size // 9
         self.board_frame = tk.Frame(self.main_frame, width=self.board_size, height=self.board_size, bg='#ffffff', highlightbackground='#cccccc', highlightthickness=2)
         self.board_frame.pack(side=tk.LEFT, padx=20, pady=20)
         self.canvas = tk.Canvas(self.board_frame, width=self.board_size, height=self.board_size, highlightthickness=0, bg='white')
         self.canvas.pack()
         self.canvas.bind('<Button-1>', self.focus_entry)
+        # Shown until the background image has been decoded.
+        self.canvas.create_rectangle(0, 0, self.board_size, self.board_size, fill='#4a5a6a', outline='')
+        self.bg_item = self.canvas.create_image(0, 0, anchor=tk.NW)
+        self.drawn_bg_path = None
+        self.drawn_size = None
+        self.entry_pool = []
+        self.entry_vars = []
+        self.validate_digit_cmd = self.root.register(self.validate_digit)
+
+    def create_board_items(self):
+        # The grid and cell items are created once per board size;
+        # draw_board only updates the ones whose content changed.  Each
+        # cell's text item is tagged 'cell_<row>_<col>'.
+        size, box = self.sudoku.size, self.sudoku.box
+        self.canvas.delete('grid')
+        self.canvas.delete('cell')
+        for row in self.entry_pool:
+            for entry in row:
+                if entry:
+                    entry.destroy()
+        self.drawn_size = size
+        self.cell_size = self.board_size // size
+        for i in range(size + 1):
+            if i % box == 0:
+                self.canvas.create_line(0, i*self.cell_size, self.board_size, i*self.cell_size, width=8, fill='#888888', tags='grid')
+                self.canvas.create_line(i*self.cell_size, 0, i*self.cell_size, self.board_size, width=8, fill='#888888', tags='grid')
+            else:
+                self.canvas.create_line(0, i*self.cell_size, self.board_size, i*self.cell_size, width=2, fill='#222', tags='grid')
+                self.canvas.create_line(i*self.cell_size, 0, i*self.cell_size, self.board_size, width=2, fill='#222', tags='grid')
+        # Fonts and padding were tuned for the 100px cells of a 9x9 board.
+        self.given_font = ('Helvetica Neue', self.cell_size * 36 // 100, 'bold')
+        self.entry_font = ('Helvetica Neue', self.cell_size * 32 // 100)
+        self.cell_pad = self.cell_size * 8 // 100
+        self.cell_text = [[None for _ in range(size)] for _ in range(size)]
+        for i in range(size):
+            for j in range(size):
+                x, y = j*self.cell_size+self.cell_size//2, i*self.cell_size+self.cell_size//2
+                self.cell_text[i][j] = self.canvas.create_text(x, y, text='', font=self.given_font, fill='white', tags=('cell', f'cell_{i}_{j}'))
+        # Entry widgets are pooled per cell and only shown for editable
+        # cells; self.entries holds the visible ones and None elsewhere.
+        self.entries = [[None for _ in range(size)] for _ in range(size)]
+        self.entry_pool = [[None for _ in range(size)] for _ in range(size)]
+        self.entry_vars = [[None for _ in range(size)] for _ in range(size)]
+        self.cell_views = [[None for _ in range(size)] for _ in range(size)]
+
+    def cell_view(self, i, j):
+        if self.loading:
+            return 'given', 0
+        val = self.sudoku.board[i][j]
+        if val:
+            return 'given', val
+        if self.revealed:
+            return 'given', self.sudoku.solution[i][j]
+        # An editable cell is reset once per game.
+        return 'entry', self.game_number
 
     def draw_board(self):
-        self.canvas.delete('all')
-        self.canvas.create_rectangle(0, 0, self.board_size, self.board_size, fill='white', outline='')
+        start = time.perf_counter()
+        self.draw_background()
+        if self.drawn_size != self.sudoku.size:
+            self.create_board_items()
+        changed = self.draw_cells()
+        elapsed = (time.perf_counter() - start) * 1000
+        status = f'Redraw: {changed} cells in {elapsed:.1f} ms'
+        if self.loading:
+            status = 'Generating puzzle...'
+        elif self.sudoku.stats is not None:
+            status += f'\nSolver: {self.sudoku.stats.summary()}'
+        self.status_var.set(status)
+
+    def draw_background(self):
+        # An image that is not in memory yet is decoded on the loader
+        # thread; the current background stays until it is ready.
+        if self.bg_path == self.drawn_bg_path:
+            return
+        photo = None
         if self.bg_path:
             try:
-                img = Image.open(self.bg_path).resize((self.board_size, self.board_size), Image.LANCZOS)
-                self.bg_image = ImageTk.PhotoImage(img)
-                self.canvas.create_image(0, 0, anchor=tk.NW, image=self.bg_image)
-            except Exception as e:
+                key = self.bg_cache.key(self.bg_path, self.board_size)
+            except OSError as e:
                 messagebox.showerror('Image Error', f'Could not load image: {e}')
-                self.bg_image = None
-        for i in range(10):
-            if i % 3 == 0:
-                self.canvas.create_line(0, i*self.cell_size, self.board_size, i*self.cell_size, width=8, fill='#888888')
-                self.canvas.create_line(i*self.cell_size, 0, i*self.cell_size, self.board_size, width=8, fill='#888888')
-            else:
-                self.canvas.create_line(0, i*self.cell_size, self.board_size, i*self.cell_size, width=2, fill='#222')
-                self.canvas.create_line(i*self.cell_size, 0, i*self.cell_size, self.board_size, width=2, fill='#222')
-        for i in range(9):
-            for j in range(9):
-                if self.entries[i][j]:
-                    self.entries[i][j].destroy()
-                self.entries[i][j] = None
-        for i in range(9):
-            for j in range(9):
-                val = self.sudoku.board[i][j]
-                x, y = j*self.cell_size+self.cell_size//2, i*self.cell_size+self.cell_size//2
-                if val != 0:
-                    self.canvas.create_text(x, y, text=str(val), font=('Helvetica Neue', 36, 'bold'), fill='white')
-                else:
-                    entry = tk.Entry(self.board_frame, justify='center', font=('Helvetica Neue', 32), width=2, bd=0, bg='white', highlightthickness=1, highlightbackground='#bbb')
-                    entry.place(x=j*self.cell_size+8, y=i*self.cell_size+8, width=self.cell_size-16, height=self.cell_size-16)
-                    self.entries[i][j] = entry
+                return
+            photo = self.bg_cache.cached(key)
+            if photo is None:
+                self.scheduler.watch('background', self.loader.submit(self.bg_cache.load_scaled, key),
+                                     lambda future: self.background_loaded(key, future))
+                return
+        self.drawn_bg_path = self.bg_path
+        self.bg_image = photo
+        self.canvas.itemconfigure(self.bg_item, image=photo or '')
+        self.mark('background shown')
+
+    def background_loaded(self, key, future):
+        try:
+            self.bg_cache.add(key, future.result())
+        except Exception as e:
+            messagebox.showerror('Image Error', f'Could not load image: {e}')
+            return
+        self.draw_background()
+
+    def draw_cells(self):
+        changed = 0
+        size = self.sudoku.size
+        for i in range(size):
+            for j in range(size):
+                view = self.cell_view(i, j)
+                if view == self.cell_views[i][j]:
+                    continue
+                self.cell_views[i][j] = view
+                changed += 1
+                entry = self.entry_pool[i][j]
+                if view[0] == 'given':
+                    self.canvas.itemconfigure(self.cell_text[i][j], text=str(view[1] or ''))
+                    if entry:
+                        entry.place_forget()
+                    self.entries[i][j] = None
+                    continue
+                self.canvas.itemconfigure(self.cell_text[i][j], text='')
+                if entry is None:
+                    var = tk.StringVar()
+                    var.trace_add('write', lambda *_, i=i, j=j: self.cell_changed(i, j))
+                    entry = tk.Entry(self.board_frame, textvariable=var, validate='key', validatecommand=(self.validate_digit_cmd, '%P'),
+                                     justify='center', font=self.entry_font, width=2, bd=0, bg='white', highlightthickness=1, highlightbackground='#bbb')
+                    self.entry_pool[i][j] = entry
+                    self.entry_vars[i][j] = var
+                entry.delete(0, tk.END)
+                entry.config(bg='white')
+                entry.place(x=j*self.cell_size+self.cell_pad, y=i*self.cell_size+self.cell_pad, width=self.cell_size-2*self.cell_pad, height=self.cell_size-2*self.cell_pad)
+                self.entries[i][j] = entry
+        return changed
 
     def new_game(self):
-        self.sudoku = Sudoku(self.level_var.get())
+        level = self.level_var.get()
+        box = BOARD_SIZES[self.size_var.get()]
+        stats = SolverStats() if self.stats_enabled.get() else None
+        # Nothing scheduled for the old game may run against the new one.
+        for key in ('puzzle', 'hint', 'victory', 'victory-check'):
+            self.scheduler.cancel(key)
+        if box == 3 and stats is None:
+            stored = self.puzzle_buffer.pop(level) or (self.bank and self.bank.random_puzzle(level))
+            if stored:
+                self.loading = False
+                self.start_game(Sudoku(level, puzzle=stored))
+                return
+        # A 9x9 puzzle the buffer and bank cannot supply takes up to a second
+        # to grade, larger boards take seconds to carve, and with stats on
+        # the puzzle is generated fresh so its work is counted; all of them
+        # are made on the loader thread while the board shows a placeholder.
+        self.loading = True
+        self.draw_board()
+        self.scheduler.watch('puzzle', self.loader.submit(Sudoku, level, box=box, stats=stats), self.puzzle_ready)
+
+    def start_game(self, sudoku):
+        self.sudoku = sudoku
+        self.play = PlayTracker(self.sudoku.board, self.sudoku.solution)
+        self.hint_engine = HintEngine(self.play)
+        self.hinted = set()
         self.selected_cell = None
+        self.revealed = False
+        self.celebrated = False
+        self.game_number += 1
         self.draw_board()
 
-    def get_board_from_entries(self):
-        board = []
-        for i in range(9):
-            row = []
-            for j in range(9):
-                if self.sudoku.board[i][j] != 0:
-                    row.append(self.sudoku.board[i][j])
-                else:
-                    entry = self.entries[i][j]
-                    val = entry.get() if entry else ''
-                    try:
-                        num = int(val)
-                    except ValueError:
-                        num = 0
-                    row.append(num)
-            board.append(row)
-        return board
+    def validate_digit(self, text):
+        # Entries accept nothing but a digit that fits this board size.
+        return text == '' or (text.isdigit() and 0 < int(text) <= self.sudoku.size)
+
+    def cell_changed(self, i, j):
+        # StringVar trace: keeps self.play current with each keystroke.
+        text = self.entry_vars[i][j].get()
+        was_solved = self.play.solved
+        self.play.set(i, j, int(text) if text.isdigit() and 0 < int(text) <= self.sudoku.size else 0)
+        status = f'Filled {self.play.filled}/{self.play.open}'
+        if self.play.conflicts:
+            status += f', {self.play.conflicts} conflicts'
+        self.status_var.set(status)
+        if self.play.solved and not was_solved:
+            self.scheduler.call_later('victory-check', 0, self.check_victory)
+        self.scheduler.cancel('hint')
 
     def check_victory(self):
-        board = self.get_board_from_entries()
-        for i in range(9):
-            for j in range(9):
-                if board[i][j] != self.sudoku.solution[i][j]:
-                    return False
+        # Celebrates once per game, however often it is called.
+        if not self.play.solved or self.celebrated:
+            return False
+        self.celebrated = True
         self.show_victory()
         return True
 
     def show_victory(self):
-        for _ in range(3):
-            self.canvas.create_rectangle(0, 0, self.board_size, self.board_size, fill='#ffe066', outline='')
-            self.root.update()
-            self.root.after(150)
-            self.canvas.create_rectangle(0, 0, self.board_size, self.board_size, fill='white', outline='')
-            self.root.update()
-            self.root.after(150)
-        messagebox.showinfo('Congratulations!', 'You solved the puzzle!')
+        self.scheduler.animate('victory', self.victory_frames(), 150, tag='victory',
+                               done=lambda: messagebox.showinfo('Congratulations!', 'You solved the puzzle!'))
+
+    def victory_frames(self):
+        # One rectangle, recolored each frame; the scheduler deletes it.
+        flash = self.canvas.create_rectangle(0, 0, self.board_size, self.board_size, fill='#ffe066', outline='', tags='victory')
+        for n in range(6):
+            yield
+            self.canvas.itemconfigure(flash, fill='white' if n % 2 == 0 else '#ffe066')
+        yield
+
+    def hint_frames(self):
+        # Hint outlines stay a few seconds, then thin out and disappear.
+        yield 4000
+        for width in range(self.cell_pad - 1, 0, -1):
+            self.canvas.itemconfigure('hint', width=width)
+            yield
 
     def hint(self):
-        # Highlight cells based on whether the entered value matches the solution
-        for i in range(9):
-            for j in range(9):
-                if self.sudoku.board[i][j] != 0:
-                    continue
-                entry = self.entries[i][j]
-                val = entry.get()
-                if val == '':
-                    entry.config(bg='white')
-                    continue
-                try:
-                    num = int(val)
-                except ValueError:
-                    entry.config(bg='#ffb6b6')
-                    continue
-                if num == self.sudoku.solution[i][j]:
-                    entry.config(bg='#b6fcb6')  # Green for correct
-                else:
-                    entry.config(bg='#ffb6b6')  # Red for incorrect
+        # Outline the cells of the next logical step and describe it.
+        self.scheduler.cancel('hint')
+        if self.revealed or self.loading or self.play.solved:
+            return
+        start = time.perf_counter()
+        step = self.hint_engine.next_step()
+        elapsed = (time.perf_counter() - start) * 1000
+        if step is None:
+            self.status_var.set('No logical step found; an entry may be wrong.')
+            return
+        size = self.sudoku.size
+        for i in step['cells']:
+            if i not in step['targets']:
+                self.outline_cell(i // size, i % size, '#ff9f1c')
+        for i in step['targets']:
+            self.outline_cell(i // size, i % size, '#e63946')
+        self.status_var.set(f'{step["text"]} ({elapsed:.1f} ms)')
+        self.scheduler.animate('hint', self.hint_frames(), 60, tag='hint')
+
+    def outline_cell(self, row, col, color):
+        # Drawn in the padding around the cell, which entries leave visible.
+        x, y, half = col * self.cell_size, row * self.cell_size, self.cell_pad // 2
+        self.canvas.create_rectangle(x + half, y + half, x + self.cell_size - half, y + self.cell_size - half,
+                                     outline=color, width=self.cell_pad, tags='hint')
+
+    def check_entries(self):
+        # Color the filled entries green or red against the solution, and
+        # clear cells colored by an earlier check that are now empty.
+        if self.loading:
+            return
+        size = self.sudoku.size
+        for i in self.hinted - self.play.entered:
+            entry = self.entries[i // size][i % size]
+            if entry:
+                entry.config(bg='white')
+        for i in self.play.entered:
+            entry = self.entries[i // size][i % size]
+            if entry:
+                entry.config(bg='#b6fcb6' if self.play.is_correct(i // size, i % size) else '#ffb6b6')
+        self.hinted = set(self.play.entered)
         self.check_victory()
 
     def solve(self):
         # Show the full solution, all numbers, and make all cells non-editable
-        for i in range(9):
-            for j in range(9):
-                if self.entries[i][j]:
-                    self.entries[i][j].destroy()
-                self.entries[i][j] = None
-        for i in range(9):
-            for j in range(9):
-                val = self.sudoku.solution[i][j]
-                x, y = j*self.cell_size+self.cell_size//2, i*self.cell_size+self.cell_size//2
-                self.canvas.create_text(x, y, text=str(val), font=('Helvetica Neue', 36, 'bold'), fill='white')
+        if self.loading:
+            return
+        self.revealed = True
+        self.draw_board()
         self.check_victory()
 
     def set_bg_from_dropdown(self, event):
@@ -251,14 +3158,65 @@ class SudokuGUI:
     def focus_entry(self, event):
         x, y = event.x, event.y
         row, col = y // self.cell_size, x // self.cell_size
-        if 0 <= row < 9 and 0 <= col < 9:
+        if 0 <= row < self.sudoku.size and 0 <= col < self.sudoku.size:
             entry = self.entries[row][col]
             if entry:
                 entry.focus_set()
-                self.root.after(100, self.check_victory)
 
-if __name__ == '__main__':
+def run_gui(startup_timing=False):
+    load_gui_modules()
     root = tk.Tk()
     root.geometry('1200x1000')
-    app = SudokuGUI(root)
+    app = SudokuGUI(root, startup=PROCESS_START if startup_timing else None)
     root.mainloop()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sudoku game. Run without a command to start the GUI.')
+    parser.add_argument('--startup-timing', action='store_true', help='print GUI startup milestones to stderr')
+    commands = parser.add_subparsers(dest='command')
+    gen = commands.add_parser('generate', help='generate puzzles headlessly')
+    gen.add_argument('--level', choices=list(LEVEL_REMOVALS), default='Easy')
+    gen.add_argument('--count', type=int, default=1)
+    gen.add_argument('--jobs', type=int, default=0, help='worker processes (default: CPU count)')
+    gen.add_argument('--seed', type=int, default=None)
+    gen.add_argument('--format', choices=['ndjson', 'lines'], default='ndjson', help='ndjson records or 81-char puzzle lines')
+    gen.add_argument('--unordered', action='store_true', help='write chunks as they finish instead of in seed order')
+    gen.add_argument('--chunk-size', type=int, default=256)
+    gen.add_argument('--symmetric', action='store_true')
+    gen.add_argument('--output', help='output file (default: stdout)')
+    gen.add_argument('--stats', action='store_true', help='print solver counters and phase timings to stderr')
+    gen.add_argument('--transform', action='store_true', help='derive puzzles from a pool of generated seeds by symmetry transformations')
+    gen.add_argument('--pool', type=int, default=64, help='seed puzzles generated for --transform')
+    gen.add_argument('--dedup', action='store_true', help='drop puzzles equivalent to one already written')
+    gen.add_argument('--dedup-db', help='SQLite file of canonical hashes; makes --dedup exact and lets runs share it')
+    gen.add_argument('--dedup-capacity', type=int, default=1000000, help='puzzles the in-memory Bloom filter is sized for')
+    bank = commands.add_parser('bank', help='build a memory-mapped puzzle bank')
+    bank.add_argument('--output', default=DEFAULT_BANK_PATH)
+    bank.add_argument('--count', type=int, default=1000, help='puzzles per level')
+    bank.add_argument('--levels', nargs='+', choices=list(LEVEL_REMOVALS), default=list(LEVEL_REMOVALS))
+    bank.add_argument('--jobs', type=int, default=0, help='worker processes (default: CPU count)')
+    bank.add_argument('--seed', type=int, default=None)
+    bank.add_argument('--chunk-size', type=int, default=256)
+    bank.add_argument('--symmetric', action='store_true')
+    bank.add_argument('--stats', action='store_true', help='print solver counters and phase timings to stderr')
+    bank.add_argument('--dedup', action='store_true', help='drop puzzles equivalent to one already written')
+    bank.add_argument('--dedup-db', help='SQLite file of canonical hashes; makes --dedup exact and lets runs share it')
+    bank.add_argument('--dedup-capacity', type=int, default=1000000, help='puzzles the in-memory Bloom filter is sized for')
+    serve = commands.add_parser('serve', help='serve generate/solve/validate/hint over HTTP')
+    serve.add_argument('--host', default='127.0.0.1')
+    serve.add_argument('--port', type=int, default=8080)
+    serve.add_argument('--jobs', type=int, default=0, help='worker processes (default: CPU count)')
+    serve.add_argument('--queue', type=int, default=64, help='requests that may wait for a worker before 503s')
+    serve.add_argument('--cache', type=int, default=4096, help='seeded puzzles kept in memory')
+    args = parser.parse_args(argv)
+    if args.command == 'serve':
+        return run_serve(args)
+    if args.command == 'generate':
+        return run_generate(args)
+    if args.command == 'bank':
+        return run_bank(args)
+    run_gui(args.startup_timing)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
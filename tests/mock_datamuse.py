@@ -0,0 +1,48 @@
+"""A local stand-in for the Datamuse API, for tests and benchmarks.
+
+    server = MockServer(('127.0.0.1', 0), MockDatamuse)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+Every request waits `latency` ms plus up to `jitter` ms; topics in
+`slow_topics` wait `slow` ms instead, and `fail` is the fraction of
+requests answered with a 500.  Each topic gets eight made-up words.
+"""
+import http.server
+import json
+import random
+import sys
+import time
+import urllib.parse
+
+class MockDatamuse(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    latency = jitter = slow = 0.0
+    fail = 0.0
+    slow_topics = frozenset()
+
+    def do_GET(self):
+        topic = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query).get('ml', [''])[0]
+        delay = self.slow if topic in self.slow_topics else self.latency + random.random() * self.jitter
+        time.sleep(delay / 1000)
+        if random.random() < self.fail:
+            body = b''
+            self.send_response(500)
+        else:
+            body = json.dumps([{'word': f'{topic[:4]}{n}', 'defs': [f'n\tmeaning {n} of {topic}']}
+                               for n in range(8)]).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+class MockServer(http.server.ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients drop connections they no longer need; that is expected.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
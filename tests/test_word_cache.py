@@ -0,0 +1,128 @@
+"""WordCache and fetch_category_words() against a local mock Datamuse.
+
+    python -m pytest tests
+"""
+import concurrent.futures
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import crossword_puzzle_random_words as crossword
+from tests.mock_datamuse import MockDatamuse, MockServer
+
+class CountingDatamuse(MockDatamuse):
+    requests = 0
+
+    def do_GET(self):
+        type(self).requests += 1
+        super().do_GET()
+
+class WordCacheTest(unittest.TestCase):
+    def setUp(self):
+        CountingDatamuse.requests = 0
+        CountingDatamuse.latency = CountingDatamuse.fail = 0.0
+        self.server = MockServer(('127.0.0.1', 0), CountingDatamuse)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.saved_url = crossword.DATAMUSE_URL
+        crossword.DATAMUSE_URL = f'http://127.0.0.1:{self.server.server_port}/words'
+        self.session = crossword.make_session()
+        self.dir = tempfile.mkdtemp()
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        self.cache.close()
+        self.session.close()
+        self.server.shutdown()
+        self.server.server_close()
+        crossword.DATAMUSE_URL = self.saved_url
+        shutil.rmtree(self.dir)
+
+    def make_cache(self, ttl=3600, capacity=10):
+        return crossword.WordCache(os.path.join(self.dir, 'words.sqlite3'), ttl, capacity)
+
+    def fetch(self, topic, timeout=crossword.FETCH_TIMEOUT, abort=None):
+        return crossword.fetch_category_words([topic], self.cache, self.session, enough=1,
+                                              timeout=timeout, deadline=2.0, abort=abort)
+
+    def age(self, topic, seconds):
+        # Pretend the entry was fetched `seconds` earlier.
+        self.cache.db.execute("UPDATE words SET fetched = fetched - ? WHERE query = ?",
+                              (seconds, crossword.topic_query(topic)))
+
+    def test_miss_then_hit(self):
+        first = self.fetch('science')
+        self.assertEqual(len(first), 8)
+        self.assertEqual(self.fetch('science'), first)
+        self.assertEqual(CountingDatamuse.requests, 1)
+        self.assertEqual(self.cache.stats(), {'hits': 1, 'misses': 1, 'stale_hits': 0})
+
+    def test_hit_survives_reopening(self):
+        self.fetch('science')
+        self.cache.close()
+        self.cache = self.make_cache()
+        self.fetch('science')
+        self.assertEqual(CountingDatamuse.requests, 1)
+
+    def test_expired_entry_is_refetched(self):
+        self.fetch('science')
+        self.age('science', 3599)
+        self.fetch('science')
+        self.assertEqual(CountingDatamuse.requests, 1)
+        self.age('science', 2)
+        self.fetch('science')
+        self.assertEqual(CountingDatamuse.requests, 2)
+        self.assertEqual(self.cache.stats()['misses'], 2)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        self.cache.close()
+        self.cache = self.make_cache(capacity=2)
+        self.fetch('biology')
+        self.fetch('physics')
+        self.fetch('biology')  # now more recently used than physics
+        self.fetch('chemistry')
+        self.assertEqual(CountingDatamuse.requests, 3)
+        count = self.cache.db.execute("SELECT COUNT(*) FROM words").fetchone()[0]
+        self.assertEqual(count, 2)
+        self.fetch('biology')
+        self.fetch('chemistry')
+        self.assertEqual(CountingDatamuse.requests, 3)
+        self.fetch('physics')
+        self.assertEqual(CountingDatamuse.requests, 4)
+
+    def test_stale_entry_served_when_server_fails(self):
+        fresh = self.fetch('science')
+        self.age('science', 7200)
+        CountingDatamuse.fail = 1.0
+        self.assertEqual(self.fetch('science'), fresh)
+        self.assertEqual(CountingDatamuse.requests, 2)
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+
+    def test_stale_entry_served_when_server_times_out(self):
+        fresh = self.fetch('science')
+        self.age('science', 7200)
+        CountingDatamuse.latency = 500.0
+        self.assertEqual(self.fetch('science', timeout=0.1), fresh)
+        self.assertEqual(self.cache.stats()['stale_hits'], 1)
+
+    def test_abort_ends_the_wait(self):
+        CountingDatamuse.latency = 1000.0
+        abort = concurrent.futures.Future()
+        abort.set_result(None)
+        start = time.monotonic()
+        self.assertEqual(self.fetch('science', abort=abort), [])
+        self.assertLess(time.monotonic() - start, 0.5)
+
+    def test_failure_without_cached_entry_returns_nothing(self):
+        CountingDatamuse.fail = 1.0
+        self.assertEqual(self.fetch('science'), [])
+        self.assertEqual(self.cache.stats()['stale_hits'], 0)
+
+if __name__ == '__main__':
+    unittest.main()